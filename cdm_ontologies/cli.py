@@ -4,6 +4,7 @@
 import sys
 import os
 import argparse
+import importlib
 import logging
 import subprocess
 from pathlib import Path
@@ -14,53 +15,86 @@ repo_path = Path(__file__).parent.parent
 scripts_path = repo_path / "scripts"
 sys.path.insert(0, str(scripts_path))
 
-# Import workflow functions
-from analyze_core_ontologies import analyze_core_ontologies
-from analyze_non_core_ontologies import analyze_non_core_ontologies
-from create_pseudo_base_ontology import create_pseudo_base_ontologies
-from merge_ontologies import merge_ontologies
-from create_semantic_sql_db import create_semantic_sql_db
-from extract_sql_tables_to_tsv import extract_sql_tables_to_tsv
-from create_parquet_files import create_parquet_files
-from resource_check import check_system_resources
+# Workflow functions take the repository root as a string
+REPO = str(repo_path)
 
 
 def setup_logging(verbose=False):
-    """Set up logging configuration."""
+    """Set up logging configuration.
+    
+    CDM_LOG_FILE overrides the log file path; set it to an empty value to
+    log to the console only (e.g. when Docker already captures output).
+    """
     level = logging.DEBUG if verbose else logging.INFO
+    handlers = [logging.StreamHandler()]
+    log_file = os.environ.get('CDM_LOG_FILE', 'logs/cdm_ontologies.log')
+    if log_file:
+        os.makedirs(os.path.dirname(log_file) or '.', exist_ok=True)
+        handlers.insert(0, logging.FileHandler(log_file))
     logging.basicConfig(
         level=level,
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler('logs/cdm_ontologies.log'),
-            logging.StreamHandler()
-        ]
+        handlers=handlers
     )
 
 
 def timestamp_print(message):
     """Print a message with timestamp prefix."""
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    print(f"[{timestamp}] {message}")
+    print(f"[{timestamp}] {message}", flush=True)
+
+
+def _find_foreign_owned(dirs, uid, gid):
+    """Yield paths under dirs that are not owned by uid:gid."""
+    for d in dirs:
+        for root, dirnames, filenames in os.walk(d):
+            for name in [''] + dirnames + filenames:
+                path = os.path.join(root, name) if name else root
+                try:
+                    st = os.lstat(path)
+                except OSError:
+                    continue
+                if st.st_uid != uid or st.st_gid != gid:
+                    yield path
 
 
 def fix_docker_permissions():
     """Fix permissions for Docker-created files."""
     try:
+        if os.path.exists('/.dockerenv'):
+            return
+        
         uid = os.getuid()
         gid = os.getgid()
         
         # Directories to fix
         dirs_to_fix = [
-            'outputs', 'outputs_test',
-            'ontology_data_owl', 'ontology_data_owl_test',
-            'logs', 'results', 'data'
+            d for d in ('outputs', 'outputs_test',
+                        'ontology_data_owl', 'ontology_data_owl_test',
+                        'logs', 'results', 'data')
+            if os.path.isdir(d)
         ]
         
+        # Usually the container already ran as this user; then nothing to do
+        foreign = _find_foreign_owned(dirs_to_fix, uid, gid)
+        if next(foreign, None) is None:
+            logging.debug("Docker file permissions already correct")
+            return
+        
+        # Root can fix ownership in-process without starting a container
+        if os.geteuid() == 0:
+            for path in _find_foreign_owned(dirs_to_fix, uid, gid):
+                try:
+                    os.lchown(path, uid, gid)
+                except OSError:
+                    pass
+            logging.debug("Fixed Docker file permissions")
+            return
+        
         # Build the chown command
         dirs_str = ' '.join(f'/workspace/{d}' for d in dirs_to_fix)
         
-        # Run Docker to fix permissions
+        # Run Docker to fix permissions of files we cannot chown ourselves
         cmd = [
             'docker', 'run', '--rm',
             '-v', f'{os.getcwd()}:/workspace',
@@ -76,6 +110,38 @@ def fix_docker_permissions():
         logging.debug(f"Permission fix skipped: {e}")
 
 
+# Pipeline steps: name -> (step number, title, "module:function", dependencies).
+# Each step needs the output of the one before it (step 2 reads the
+# external-term TSV written by step 1; the Parquet export reports its size
+# against the finished TSV export), so run-all runs them in this order.
+PIPELINE_STEPS = {
+    'analyze-core': (1, 'Analyzing Core Ontologies', 'analyze_core_ontologies:analyze_core_ontologies', ()),
+    'analyze-non-core': (2, 'Analyzing Non-Core Ontologies', 'analyze_non_core_ontologies:analyze_non_core_ontologies', ('analyze-core',)),
+    'create-base': (3, 'Creating Pseudo Base Ontologies', 'create_pseudo_base_ontology:create_pseudo_base_ontologies', ('analyze-non-core',)),
+    'merge': (4, 'Merging Ontologies', 'merge_ontologies:merge_ontologies', ('create-base',)),
+    'create-db': (5, 'Creating Semantic SQL Database', 'create_semantic_sql_db:create_semantic_sql_db', ('merge',)),
+    'extract-tables': (6, 'Extracting SQL Tables to TSV', 'extract_sql_tables_to_tsv:extract_sql_tables_to_tsv', ('create-db',)),
+    'create-parquet': (7, 'Creating Parquet Files', 'create_parquet_files:create_parquet_files', ('extract-tables',)),
+}
+
+
+def load_step(name):
+    """Import a step's module on first use and return its workflow function.
+    
+    Step modules pull in heavy dependencies (requests, lxml, pandas, ...),
+    so they are only imported for the commands that actually run.
+    """
+    module_name, func_name = PIPELINE_STEPS[name][2].split(':')
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+def run_step(name):
+    """Run a single pipeline step, treating a False return value as failure."""
+    number, title, _, _ = PIPELINE_STEPS[name]
+    if load_step(name)(REPO) is False:
+        raise Exception(f"{title} failed")
+
+
 def run_all(args):
     """Run the complete workflow."""
     timestamp_print("Starting CDM Ontologies Workflow...")
@@ -83,92 +149,33 @@ def run_all(args):
     # Resource check
     if not args.skip_resource_check and not os.getenv('SKIP_RESOURCE_CHECK', '').lower() == 'true':
         timestamp_print("🔍 Checking system resources...")
+        from resource_check import check_system_resources
         success, message = check_system_resources()
         print(message)
         if not success:
             timestamp_print("⚠️  Resource check failed. Use --skip-resource-check to override.")
             return 1
     
-    # Step 1: Analyze Core Ontologies
-    timestamp_print("Step 1: Analyzing Core Ontologies...")
-    try:
-        analyze_core_ontologies(str(repo_path))
-        timestamp_print("Step 1: Completed analyzing core ontologies")
-    except Exception as e:
-        logging.error(f"Failed to analyze core ontologies: {e}")
-        timestamp_print(f"Step 1: Failed - {e}")
-        if not args.continue_on_error:
-            return 1
-    
-    # Step 2: Analyze Non-Core Ontologies
-    timestamp_print("Step 2: Analyzing Non-Core Ontologies...")
-    try:
-        analyze_non_core_ontologies(str(repo_path))
-        timestamp_print("Step 2: Completed analyzing non-core ontologies")
-    except Exception as e:
-        logging.error(f"Failed to analyze non-core ontologies: {e}")
-        timestamp_print(f"Step 2: Failed - {e}")
-        if not args.continue_on_error:
-            return 1
-    
-    # Step 3: Create Pseudo Base Ontologies
-    timestamp_print("Step 3: Creating Pseudo Base Ontologies...")
-    try:
-        create_pseudo_base_ontologies(str(repo_path))
-        timestamp_print("Step 3: Completed creating pseudo base ontologies")
-    except Exception as e:
-        logging.error(f"Failed to create pseudo base ontologies: {e}")
-        timestamp_print(f"Step 3: Failed - {e}")
-        if not args.continue_on_error:
-            return 1
-    
-    # Step 4: Merge Ontologies
-    timestamp_print("Step 4: Merging Ontologies...")
-    try:
-        if not merge_ontologies(str(repo_path)):
-            raise Exception("Ontology merge failed")
-        timestamp_print("Step 4: Completed merging ontologies")
-    except Exception as e:
-        logging.error(f"Failed to merge ontologies: {e}")
-        timestamp_print(f"Step 4: Failed - {e}")
-        if not args.continue_on_error:
-            return 1
-    
-    # Step 5: Create Semantic SQL Database
-    timestamp_print("Step 5: Creating Semantic SQL Database...")
-    try:
-        if not create_semantic_sql_db(str(repo_path)):
-            raise Exception("Database creation failed")
-        timestamp_print("Step 5: Completed creating semantic SQL database")
-    except Exception as e:
-        logging.error(f"Failed to create database: {e}")
-        timestamp_print(f"Step 5: Failed - {e}")
-        if not args.continue_on_error:
-            return 1
-    
-    # Step 6: Extract SQL Tables to TSV
-    timestamp_print("Step 6: Extracting SQL Tables to TSV...")
-    try:
-        if not extract_sql_tables_to_tsv(str(repo_path)):
-            raise Exception("TSV extraction failed")
-        timestamp_print("Step 6: Completed extracting SQL tables to TSV")
-    except Exception as e:
-        logging.error(f"Failed to extract tables: {e}")
-        timestamp_print(f"Step 6: Failed - {e}")
-        if not args.continue_on_error:
-            return 1
-    
-    # Step 7: Create Parquet Files
-    timestamp_print("Step 7: Creating Parquet Files...")
-    try:
-        if not create_parquet_files(str(repo_path)):
-            raise Exception("Parquet creation failed")
-        timestamp_print("Step 7: Completed creating parquet files")
-    except Exception as e:
-        logging.error(f"Failed to create parquet files: {e}")
-        timestamp_print(f"Step 7: Failed - {e}")
-        if not args.continue_on_error:
-            return 1
+    # Steps run in table order, in this process; the table lists each
+    # step after its dependencies
+    completed, failed = set(), set()
+    for name, (number, title, _, deps) in PIPELINE_STEPS.items():
+        unmet = [dep for dep in deps if dep not in completed and dep not in failed]
+        if unmet:
+            raise RuntimeError(f"Step {name} is listed before its dependencies: {', '.join(unmet)}")
+        
+        timestamp_print(f"Step {number}: {title}...")
+        try:
+            run_step(name)
+            completed.add(name)
+            timestamp_print(f"Step {number}: Completed {title[0].lower()}{title[1:]}")
+        except Exception as e:
+            failed.add(name)
+            logging.error(f"Step {number} ({title}) failed: {e}")
+            timestamp_print(f"Step {number}: Failed - {e}")
+            # --continue-on-error still runs the steps after a failure
+            if not args.continue_on_error:
+                return 1
     
     # Fix Docker permissions if running outside Docker
     if 'DOCKER_CONTAINER' not in os.environ:
@@ -223,28 +230,13 @@ def main():
     # Execute the appropriate command
     if args.command == 'run-all':
         return run_all(args)
-    elif args.command == 'analyze-core':
-        analyze_core_ontologies(str(repo_path))
-    elif args.command == 'analyze-non-core':
-        analyze_non_core_ontologies(str(repo_path))
-    elif args.command == 'create-base':
-        create_pseudo_base_ontologies(str(repo_path))
-    elif args.command == 'merge':
-        if not merge_ontologies(str(repo_path)):
-            return 1
-    elif args.command == 'create-db':
-        if not create_semantic_sql_db(str(repo_path)):
-            return 1
-    elif args.command == 'extract-tables':
-        if not extract_sql_tables_to_tsv(str(repo_path)):
-            return 1
-    elif args.command == 'create-parquet':
-        if not create_parquet_files(str(repo_path)):
-            return 1
-    else:
+    if args.command not in PIPELINE_STEPS:
         parser.print_help()
         return 1
     
+    # Steps signal failure by returning False
+    if load_step(args.command)(REPO) is False:
+        return 1
     return 0
 
 
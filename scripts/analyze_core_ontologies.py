@@ -1,49 +1,125 @@
 import os
 import json
-import requests
-import xml.etree.ElementTree as ET
 import hashlib
+import heapq
 from pathlib import Path
 from datetime import datetime
 import re
-from enhanced_download import download_ontology_safe, get_output_directories, is_test_mode
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from enhanced_download import (
+    download_ontology_safe, flush_head_cache, get_output_directories, is_test_mode, url_exists
+)
+from version_tracker import get_file_checksum
+from ontology_sources import get_source_file, ontology_name, parse_sections
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+
+try:
+    from lxml import etree as ET
+    HAVE_LXML = True
+except ImportError:
+    import xml.etree.ElementTree as ET
+    HAVE_LXML = False
+
+RDF_NS = 'http://www.w3.org/1999/02/22-rdf-syntax-ns#'
+OWL_NS = 'http://www.w3.org/2002/07/owl#'
+RDF_ABOUT = '{' + RDF_NS + '}about'
+OWL_IMPORTS = '{' + OWL_NS + '}imports'
+OWL_ONTOLOGY = '{' + OWL_NS + '}Ontology'
+
+OBO_PREFIX = 'http://purl.obolibrary.org/obo/'
+NCBITAXON_IRI = OBO_PREFIX + 'ncbitaxon'
+_OBO_ID_RE = re.compile(r'([A-Za-z]+)(?:_|#|\.|$)')
+# Same rule as _OBO_ID_RE, anchored for pyarrow's RE2 engine
+_OBO_ID_PATTERN = '^' + re.escape(OBO_PREFIX) + r'(?P<prefix>[A-Za-z]+)(?:_|#|\.|$)'
+
+# filename -> (base version available, base version URL)
+_base_availability = {}
+
+# Bump when analyze_ontology changes what it records
+ANALYSIS_CACHE_VERSION = 1
+_TERM_SETS = ('own_terms', 'external_terms', 'external_terms_as_subjects')
 
 def normalize_iri(iri):
     """Normalize IRI to extract the base ontology prefix and standardize to lowercase."""
-    if not iri:
-        return None
-    
-    # Skip non-OBO IRIs
-    if 'obo' not in iri:
+    # Skip empty and non-OBO IRIs
+    if not iri or 'obo' not in iri:
         return None
         
     # Handle NCBITaxon special case
     if 'NCBITaxon' in iri:
-        return 'http://purl.obolibrary.org/obo/ncbitaxon'
+        return NCBITAXON_IRI
+    
+    if not iri.startswith(OBO_PREFIX):
+        return None
         
     # Extract ontology prefix for OBO terms
-    match = re.match(r'http://purl\.obolibrary\.org/obo/([A-Za-z]+)(?:_|#|\.|$)', iri)
+    match = _OBO_ID_RE.match(iri, len(OBO_PREFIX))
     if match:
-        return f"http://purl.obolibrary.org/obo/{match.group(1).lower()}"
+        return OBO_PREFIX + match.group(1).lower()
     
     return None
 
+def normalize_iris(iris):
+    """Return the set of normalized ontology IRIs for a collection of term IRIs.
+    
+    Equivalent to applying normalize_iri to each term and dropping Nones, but
+    runs as vectorized pyarrow kernels when pyarrow is installed.
+    """
+    if pa is None or not iris:
+        return {n for iri in iris if (n := normalize_iri(iri))}
+    
+    arr = pa.array(list(iris), type=pa.string())
+    # normalize_iri only considers IRIs containing 'obo' at all
+    arr = pc.filter(arr, pc.match_substring(arr, 'obo'))
+    is_ncbitaxon = pc.match_substring(arr, 'NCBITaxon')
+    normalized = set()
+    if pc.any(is_ncbitaxon).as_py():
+        normalized.add(NCBITAXON_IRI)
+    
+    obo_terms = pc.filter(arr, pc.and_(pc.invert(is_ncbitaxon), pc.starts_with(arr, OBO_PREFIX)))
+    prefixes = pc.struct_field(pc.extract_regex(obo_terms, _OBO_ID_PATTERN), [0])
+    prefixes = pc.unique(pc.utf8_lower(pc.drop_null(prefixes)))
+    normalized.update(OBO_PREFIX + prefix for prefix in prefixes.to_pylist())
+    return normalized
+
 def download_ontology(url, output_path, repo_path):
     """Download an ontology file using enhanced download system."""
     return download_ontology_safe(url, output_path, repo_path)
 
 def check_obo_foundry_availability(filename):
     """Check if a -base version exists in OBO Foundry."""
-    short_name = filename.split('.')[0].lower()
+    cached = _base_availability.get(filename)
+    if cached is not None:
+        return cached
+    
+    short_name = ontology_name(filename).lower()
     if short_name.endswith('-base'):
         short_name = short_name[:-5]
     url = f"http://purl.obolibrary.org/obo/{short_name}/{short_name}-base.owl"
     
-    try:
-        response = requests.head(url, allow_redirects=True, timeout=5)
-        return (response.status_code == 200, url)
-    except requests.RequestException:
-        return (False, url)
+    result = (url_exists(url), url)
+    _base_availability[filename] = result
+    return result
+
+def prefetch_obo_foundry_availability(filenames, max_workers=16):
+    """Run the -base availability checks for all filenames concurrently."""
+    pending = [f for f in dict.fromkeys(filenames) if f not in _base_availability]
+    if not pending:
+        return
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(pending))) as executor:
+        # Results are stored by check_obo_foundry_availability itself
+        list(executor.map(check_obo_foundry_availability, pending))
+    flush_head_cache()
 
 def classify_ontology(analysis, filename):
     """Classify the ontology based on analysis results."""
@@ -60,9 +136,9 @@ def classify_ontology(analysis, filename):
     
     # Otherwise proceed with normal classification
     no_imports = not analysis['has_imports']
-    more_own_terms = len(analysis['own_terms']) > len(analysis['external_terms'])
+    more_own_terms = analysis['own_terms_count'] > analysis['external_terms_count']
     base_hint = "base" in filename.lower()
-    high_own_term_ratio = len(analysis['own_terms']) / (len(analysis['external_terms']) + 1) > 10
+    high_own_term_ratio = analysis['own_terms_count'] / (analysis['external_terms_count'] + 1) > 10
     
     if base_hint and no_imports:
         return f"Base.{base_version_info}"
@@ -71,67 +147,279 @@ def classify_ontology(analysis, filename):
     else:
         return f"Non-Base.{base_version_info}"
 
-def analyze_ontology(file_path):
-    """Analyze a single ontology file."""
-    try:
-        tree = ET.parse(file_path)
-        root = tree.getroot()
-        namespaces = {
-            'rdf': 'http://www.w3.org/1999/02/22-rdf-syntax-ns#',
-            'owl': 'http://www.w3.org/2002/07/owl#',
-            'rdfs': 'http://www.w3.org/2000/01/rdf-schema#'
-        }
-        
-        # Extract filename
-        filename = os.path.basename(file_path)
-        short_name = filename.split('.')[0].upper()
-        
-        results = {
-            'file': filename,
-            'has_imports': False,
-            'ontology_iri': None,
-            'own_terms': set(),
-            'external_terms': set(),
-            'external_terms_as_subjects': set()
-        }
-        
-        # Check for imports
-        imports = root.findall('.//owl:imports', namespaces)
-        results['has_imports'] = len(imports) > 0
+def _iterparse(source):
+    """Stream parse events, using lxml's huge-tree mode when available.
+    
+    lxml only needs 'end' events since the root is reachable from any
+    element; the stdlib parser also needs 'start' to see the root first.
+    """
+    if HAVE_LXML:
+        return ET.iterparse(source, events=('end',), huge_tree=True)
+    return ET.iterparse(source, events=('start', 'end'))
+
+def new_analysis_results(filename):
+    """Empty analysis result for a file."""
+    return {
+        'file': filename,
+        'has_imports': False,
+        'ontology_iri': None,
+        'own_terms': set(),
+        'external_terms': set(),
+        'external_terms_as_subjects': set()
+    }
+
+def scan_rdf_xml(source, short_name, results):
+    """Stream an RDF/XML document (path or binary file object) into results.
+    
+    Each top-level resource is cleared once it has been classified, so
+    memory stays flat regardless of file size. Parse errors propagate.
+    """
+    # Substring probes for own terms, built once rather than per element
+    is_ncbitaxon = short_name == 'NCBITAXON'
+    own_probe = f"/{short_name}_"
+    own_probe_hash = f"/{short_name}#"
+    own_terms = results['own_terms']
+    external_terms = results['external_terms']
+    external_subjects = results['external_terms_as_subjects']
+    
+    root = None
+    found_ontology = False
+    for event, element in _iterparse(source):
+        if root is None:
+            root = element.getroottree().getroot() if HAVE_LXML else element
+        if event == 'start':
+            continue
+        if element is root:
+            break
         
-        # Get ontology IRI
-        ontology = root.find('.//owl:Ontology', namespaces)
-        if ontology is not None:
-            results['ontology_iri'] = ontology.get('{' + namespaces['rdf'] + '}about')
+        tag = element.tag
+        if tag == OWL_IMPORTS:
+            # Check for imports
+            results['has_imports'] = True
+        elif tag == OWL_ONTOLOGY and not found_ontology:
+            # Get ontology IRI
+            found_ontology = True
+            results['ontology_iri'] = element.get(RDF_ABOUT)
         
         # Analyze terms
-        for element in root.findall('.//*[@rdf:about]', namespaces):
-            term_iri = element.get('{' + namespaces['rdf'] + '}about')
-            
+        term_iri = element.get(RDF_ABOUT)
+        if term_iri is not None:
             # Special handling for NCBITaxon
-            if short_name == 'NCBITAXON':
-                if 'NCBITaxon_' in term_iri or 'NCBITaxon#' in term_iri:
-                    results['own_terms'].add(term_iri)
-                    continue
-            
+            if is_ncbitaxon and ('NCBITaxon_' in term_iri or 'NCBITaxon#' in term_iri):
+                own_terms.add(term_iri)
             # Regular term classification
-            if f"/{short_name}_" in term_iri or f"/{short_name}#" in term_iri:
-                results['own_terms'].add(term_iri)
+            elif own_probe in term_iri or own_probe_hash in term_iri:
+                own_terms.add(term_iri)
             else:
-                results['external_terms'].add(term_iri)
+                external_terms.add(term_iri)
                 if len(element) > 0:
-                    results['external_terms_as_subjects'].add(term_iri)
+                    external_subjects.add(term_iri)
         
-        return results
+        # Drop finished top-level resources so the tree never grows
+        if root[-1] is element:
+            root.clear()
+    
+    return results
+
+def analyze_ontology(file_path):
+    """Analyze a single RDF/XML ontology file."""
+    try:
+        # Extract filename
+        filename = os.path.basename(file_path)
+        short_name = ontology_name(filename).upper()
+        
+        return scan_rdf_xml(file_path, short_name, new_analysis_results(filename))
     except Exception as e:
         print(f"Error analyzing {file_path}: {str(e)}")
         return None
 
+def load_cached_analysis(cache_path, filename):
+    """Return a cached analysis result, or None if missing or stale."""
+    try:
+        with open(cache_path, 'rb') as f:
+            cached = orjson.loads(f.read()) if orjson is not None else json.load(f)
+    except (OSError, ValueError):
+        return None
+    if cached.get('version') != ANALYSIS_CACHE_VERSION or cached.get('file') != filename:
+        return None
+    result = cached['result']
+    for key in _TERM_SETS:
+        result[key] = set(result[key])
+    return result
+
+def save_cached_analysis(cache_path, result):
+    """Store an analysis result; written to a temp file first so readers never see partial JSON."""
+    data = dict(result)
+    for key in _TERM_SETS:
+        data[key] = list(data[key])
+    payload = {'version': ANALYSIS_CACHE_VERSION, 'file': result['file'], 'result': data}
+    tmp_path = f"{cache_path}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(orjson.dumps(payload) if orjson is not None else json.dumps(payload).encode())
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"⚠️  Could not write analysis cache {cache_path}: {e}")
+
+def cached_file_checksum(file_path, cache_dir):
+    """SHA256 of a file, reusing the stored value while its size and mtime are unchanged."""
+    stat = os.stat(file_path)
+    stamp = [stat.st_size, stat.st_mtime_ns]
+    path_key = hashlib.sha256(os.path.abspath(file_path).encode()).hexdigest()[:16]
+    stamp_path = os.path.join(cache_dir, f"{path_key}.stat.json")
+    try:
+        with open(stamp_path, 'r') as f:
+            saved = json.load(f)
+        if saved.get('stat') == stamp:
+            return saved['sha256']
+    except (OSError, ValueError, KeyError):
+        pass
+    
+    checksum = get_file_checksum(file_path)
+    tmp_path = f"{stamp_path}.tmp"
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump({'stat': stamp, 'sha256': checksum}, f)
+        os.replace(tmp_path, stamp_path)
+    except OSError as e:
+        print(f"⚠️  Could not write analysis cache {stamp_path}: {e}")
+    return checksum
+
+def analyze_ontology_cached(file_path, cache_dir, analyze=analyze_ontology):
+    """Analyze an ontology, reusing the stored result when the file is unchanged.
+    
+    Results are keyed by the SHA256 of the file contents, so re-runs over
+    unchanged downloads skip the parse. The hash itself is only recomputed
+    when the file's size or mtime changes.
+    """
+    filename = os.path.basename(file_path)
+    # Own/external split depends on the file name, so it is part of the key
+    cache_path = os.path.join(cache_dir, f"{cached_file_checksum(file_path, cache_dir)}-{filename}.json")
+    result = load_cached_analysis(cache_path, filename)
+    if result is not None:
+        print(f"♻️  Using cached analysis for {filename}")
+        return result
+    
+    result = analyze(file_path)
+    if result is not None:
+        save_cached_analysis(cache_path, result)
+    return result
+
+def summarize_analysis(result, sample_size=5):
+    """Replace the term sets of a result with their sizes and first few terms.
+    
+    The reports only use '<set>_count' and the sorted sample left under the
+    original key, so workers send back this instead of millions of IRIs.
+    """
+    summary = {key: value for key, value in result.items() if key not in _TERM_SETS}
+    for key in _TERM_SETS:
+        summary[f"{key}_count"] = len(result[key])
+        summary[key] = heapq.nsmallest(sample_size, result[key])
+    return summary
+
+def analyze_and_normalize(file_path, cache_dir):
+    """Analyze a file and add the normalized ontology IRIs of its external terms.
+    
+    Runs in the worker process, so the parent only merges the small sets of
+    ontology IRIs and a summary of the terms instead of the raw term sets.
+    """
+    result = analyze_ontology_cached(file_path, cache_dir)
+    if result is None:
+        return None
+    result['normalized_external_terms'] = normalize_iris(result['external_terms'])
+    result['normalized_external_subjects'] = normalize_iris(result['external_terms_as_subjects'])
+    return summarize_analysis(result)
+
+def submit_analyses(analyze, file_paths, *args):
+    """Start analyze(path, *args) for each file in worker processes; returns {path: future}.
+    
+    Parsing is CPU-bound and independent per file, so the files are spread
+    over ANALYSIS_WORKERS processes (default: one per CPU).
+    """
+    if not file_paths:
+        return {}
+    max_workers = int(os.environ.get('ANALYSIS_WORKERS', os.cpu_count() or 1))
+    executor = ProcessPoolExecutor(max_workers=max(1, min(max_workers, len(file_paths))))
+    futures = {path: executor.submit(analyze, path, *args) for path in file_paths}
+    # Already submitted work still runs; this just releases the pool when done
+    executor.shutdown(wait=False)
+    return futures
+
+def write_json(path, data):
+    """Write data as indented JSON, using orjson when it is installed."""
+    if orjson is not None:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2)
+
+def append_jsonl(f, record):
+    """Append one JSON record to an open JSON Lines file and flush it."""
+    if orjson is not None:
+        f.write(orjson.dumps(record) + b"\n")
+    else:
+        f.write(json.dumps(record).encode() + b"\n")
+    f.flush()
+
+def write_lines(path, lines):
+    """Write one entry per line with a single buffered write."""
+    with open(path, 'w') as f:
+        f.write(''.join(f"{line}\n" for line in lines))
+
+def report_analysis(result, classification, non_base=False):
+    """Print the summary of one analyzed ontology and return its JSON record.
+    
+    Ontologies from the non-base folder are tagged as such and printed
+    without the term samples.
+    """
+    folder_note = " (non-base folder)" if non_base else ""
+    
+    # Create streamlined result for JSON
+    json_result = {
+        "file_name": result['file'],
+        "has_imports": result['has_imports'],
+        "ontology_iri": result['ontology_iri'],
+        "own_terms_count": result['own_terms_count'],
+        "external_terms_count": result['external_terms_count'],
+        "classification": classification + folder_note,
+        "external_terms_as_subjects": result['external_terms_as_subjects'],
+        "own_terms": result['own_terms'],
+        "external_terms": result['external_terms']
+    }
+    
+    # Print analysis results
+    print(f"\nFile: {result['file']}{folder_note}")
+    print(f"  Has imports: {'Yes' if result['has_imports'] else 'No'}")
+    print(f"  Ontology IRI: {result['ontology_iri']}")
+    print(f"  Own terms: {result['own_terms_count']}")
+    print(f"  External terms: {result['external_terms_count']}")
+    print(f"  Classification: {classification}")
+    if non_base:
+        return json_result
+    
+    if result['external_terms_as_subjects']:
+        print("  External Terms Subject of Triples? Yes")
+        print(f"  Number of external terms that are subjects of triples: {result['external_terms_as_subjects_count']}")
+        print("  First 5 external terms that are subject of triples:")
+        for term in json_result['external_terms_as_subjects']:
+            print(f"    {term}")
+    else:
+        print("  External Terms Subject of Triples? No")
+    
+    print("  First 5 own terms:")
+    for term in json_result['own_terms']:
+        print(f"    {term}")
+    
+    print("  First 5 external terms:")
+    for term in json_result['external_terms']:
+        print(f"    {term}")
+    return json_result
+
 def analyze_core_ontologies(repo_path):
     """Main function to analyze core ontologies."""
     # Setup paths - support test configuration
-    source_file = os.environ.get('ONTOLOGIES_SOURCE_FILE', 'ontologies_source.txt')
-    ontologies_path = os.path.join(repo_path, source_file)
+    ontologies_path = get_source_file(repo_path)
     
     # Get appropriate directories based on test mode
     test_mode = is_test_mode()
@@ -145,170 +433,109 @@ def analyze_core_ontologies(repo_path):
     
     # Process ontologies and gather results
     analysis_results = []
-    all_external_terms = set()
-    all_external_subjects = set()
+    unique_external_terms = set()
+    unique_subject_terms = set()
     
     # Directories are created by get_output_directories
     
     # Read ontologies from source file and classify by section
     main_dir_ontologies = []
     non_base_ontologies = []
-    current_section = None
     
     try:
-        with open(ontologies_path, 'r') as f:
-            for line in f:
-                line = line.strip()
-                
-                # Track section headers
-                if line.startswith('#'):
-                    current_section = line.lower()
-                    continue
-                
-                # Skip empty lines
-                if not line:
-                    continue
-                    
-                # Classify ontology based on section
-                if current_section and 'non base version' in current_section:
-                    non_base_ontologies.append(line)
-                else:
-                    main_dir_ontologies.append(line)
-                    
+        sections = parse_sections(ontologies_path)
     except Exception as e:
         print(f"Error reading ontologies source file: {str(e)}")
         return
     
+    # Classify ontology based on section
+    for section, entries in sections.items():
+        if section and 'non base version' in section.lower():
+            non_base_ontologies.extend(entries)
+        else:
+            main_dir_ontologies.extend(entries)
+    
     print(f"📁 Main directory ontologies: {len(main_dir_ontologies)}")
     print(f"📁 Non-base ontologies: {len(non_base_ontologies)}")
     
+    # Parsed analyses are cached by content hash across runs (shared with
+    # the non-core analysis, which re-reads the non-base folder)
+    cache_dir = os.path.join(outputs_path, '.cache')
+    os.makedirs(cache_dir, exist_ok=True)
+    
     # Create non-base-ontologies directory
     non_base_dir = os.path.join(ontology_data_path, 'non-base-ontologies')
     os.makedirs(non_base_dir, exist_ok=True)
     
-    # Process main directory ontologies
-    for url in main_dir_ontologies:
-        filename = os.path.basename(url)
-        output_path = os.path.join(ontology_data_path, filename)
-        
-        print(f"Downloading core ontology: {filename}")
-        if not download_ontology(url, output_path, repo_path):
-            print(f"⚠️  Failed to download {filename}, skipping analysis")
-            continue
-        
-        # Analyze ontology
-        result = analyze_ontology(output_path)
-        if result:
-            classification = classify_ontology(result, filename)
-            
-            # Create streamlined result for JSON
-            json_result = {
-                "file_name": result['file'],
-                "has_imports": result['has_imports'],
-                "ontology_iri": result['ontology_iri'],
-                "own_terms_count": len(result['own_terms']),
-                "external_terms_count": len(result['external_terms']),
-                "classification": classification,
-                "external_terms_as_subjects": sorted(list(result['external_terms_as_subjects']))[:5],
-                "own_terms": sorted(list(result['own_terms']))[:5],
-                "external_terms": sorted(list(result['external_terms']))[:5]
-            }
-            analysis_results.append(json_result)
-            
-            # Print analysis results
-            print(f"\nFile: {result['file']}")
-            print(f"  Has imports: {'Yes' if result['has_imports'] else 'No'}")
-            print(f"  Ontology IRI: {result['ontology_iri']}")
-            print(f"  Own terms: {len(result['own_terms'])}")
-            print(f"  External terms: {len(result['external_terms'])}")
-            print(f"  Classification: {classification}")
-            
-            if result['external_terms_as_subjects']:
-                print("  External Terms Subject of Triples? Yes")
-                print(f"  Number of external terms that are subjects of triples: {len(result['external_terms_as_subjects'])}")
-                print("  First 5 external terms that are subject of triples:")
-                for term in sorted(list(result['external_terms_as_subjects']))[:5]:
-                    print(f"    {term}")
-            else:
-                print("  External Terms Subject of Triples? No")
-            
-            print("  First 5 own terms:")
-            for term in sorted(list(result['own_terms']))[:5]:
-                print(f"    {term}")
-            
-            print("  First 5 external terms:")
-            for term in sorted(list(result['external_terms']))[:5]:
-                print(f"    {term}")
-            
-            # Collect terms for TSV files
-            all_external_terms.update(result['external_terms'])
-            all_external_subjects.update(result['external_terms_as_subjects'])
-    
-    # Process non-base ontologies (go to non-base-ontologies directory)
-    for url in non_base_ontologies:
-        filename = os.path.basename(url)
-        output_path = os.path.join(non_base_dir, filename)
-        
-        print(f"Downloading non-base ontology: {filename}")
-        if not download_ontology(url, output_path, repo_path):
-            print(f"⚠️  Failed to download {filename}, skipping analysis")
-            continue
+    # Download all ontologies concurrently; downloads are network-bound and
+    # independent, so only the analysis below needs to run in order
+    downloads = [(url, os.path.join(ontology_data_path, os.path.basename(url)), "core")
+                 for url in main_dir_ontologies]
+    downloads += [(url, os.path.join(non_base_dir, os.path.basename(url)), "non-base")
+                  for url in non_base_ontologies]
+    # Check OBO Foundry for -base versions up front instead of one HEAD
+    # request per ontology during classification
+    prefetch_obo_foundry_availability(os.path.basename(url) for url, _, _ in downloads)
+    
+    downloaded = set()
+    max_workers = max(1, int(os.environ.get('PARALLEL_DOWNLOADS', '10')))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {}
+        for url, output_path, kind in downloads:
+            print(f"Downloading {kind} ontology: {os.path.basename(url)}")
+            futures[executor.submit(download_ontology, url, output_path, repo_path)] = output_path
+        for future in as_completed(futures):
+            if future.result():
+                downloaded.add(futures[future])
+    
+    # Each result is also appended to a JSON Lines file as soon as it is
+    # ready, so a crash part-way through keeps the ontologies already analyzed
+    jsonl_path = os.path.join(outputs_path, 'core_ontologies_analysis.jsonl')
+    with open(jsonl_path, 'wb') as jsonl_file:
+        # Parse all downloaded files in parallel; results are reported in order below
+        main_paths = [os.path.join(ontology_data_path, os.path.basename(url)) for url in main_dir_ontologies]
+        non_base_paths = [os.path.join(non_base_dir, os.path.basename(url)) for url in non_base_ontologies]
+        analyses = submit_analyses(
+            analyze_and_normalize, [path for path in main_paths + non_base_paths if path in downloaded], cache_dir)
         
-        # Analyze ontology
-        result = analyze_ontology(output_path)
-        if result:
-            classification = classify_ontology(result, filename)
-            
-            # Create streamlined result for JSON
-            json_result = {
-                "file_name": result['file'],
-                "has_imports": result['has_imports'],
-                "ontology_iri": result['ontology_iri'],
-                "own_terms_count": len(result['own_terms']),
-                "external_terms_count": len(result['external_terms']),
-                "classification": classification + " (non-base folder)",
-                "external_terms_as_subjects": sorted(list(result['external_terms_as_subjects']))[:5],
-                "own_terms": sorted(list(result['own_terms']))[:5],
-                "external_terms": sorted(list(result['external_terms']))[:5]
-            }
-            analysis_results.append(json_result)
-            
-            # Print analysis results
-            print(f"\nFile: {result['file']} (non-base folder)")
-            print(f"  Has imports: {'Yes' if result['has_imports'] else 'No'}")
-            print(f"  Ontology IRI: {result['ontology_iri']}")
-            print(f"  Own terms: {len(result['own_terms'])}")
-            print(f"  External terms: {len(result['external_terms'])}")
-            print(f"  Classification: {classification}")
-            
-            # Collect terms for TSV files
-            all_external_terms.update(result['external_terms'])
-            all_external_subjects.update(result['external_terms_as_subjects'])
+        # Process main directory ontologies, then non-base ontologies (which go
+        # to the non-base-ontologies directory)
+        for urls, target_dir, non_base in ((main_dir_ontologies, ontology_data_path, False),
+                                           (non_base_ontologies, non_base_dir, True)):
+            for url in urls:
+                filename = os.path.basename(url)
+                output_path = os.path.join(target_dir, filename)
+                
+                if output_path not in downloaded:
+                    print(f"⚠️  Failed to download {filename}, skipping analysis")
+                    continue
+                
+                # Analyze ontology
+                result = analyses.pop(output_path).result()
+                if result:
+                    json_result = report_analysis(result, classify_ontology(result, filename), non_base)
+                    analysis_results.append(json_result)
+                    append_jsonl(jsonl_file, json_result)
+                    
+                    # Collect terms for TSV files
+                    unique_external_terms.update(result['normalized_external_terms'])
+                    unique_subject_terms.update(result['normalized_external_subjects'])
     
     # Save results
     os.makedirs(outputs_path, exist_ok=True)
     
     # Save streamlined JSON results
     json_path = os.path.join(outputs_path, 'core_ontologies_analysis.json')
-    with open(json_path, 'w') as f:
-        json.dump(analysis_results, f, indent=2)
+    write_json(json_path, analysis_results)
     
     # Save TSV files
-    unique_external_terms = {normalize_iri(term) for term in all_external_terms if normalize_iri(term)}
-    unique_subject_terms = {normalize_iri(term) for term in all_external_subjects if normalize_iri(term)}
-    
     terms_path = os.path.join(outputs_path, 'core_onto_unique_external_terms.tsv')
-    with open(terms_path, 'w') as f:
-        for term in sorted(unique_external_terms):
-            if term:
-                f.write(f"{term}\n")
+    write_lines(terms_path, sorted(unique_external_terms))
     
     subjects_path = os.path.join(outputs_path, 'core_onto_unique_external_subjects.tsv')
-    with open(subjects_path, 'w') as f:
-        for term in sorted(unique_subject_terms):
-            if term:
-                f.write(f"{term}\n")
+    write_lines(subjects_path, sorted(unique_subject_terms))
     
+    flush_head_cache()
     print("\nAnalysis complete!")
 
 if __name__ == "__main__":
@@ -1,129 +1,91 @@
 import os
-import json
-import requests
-import xml.etree.ElementTree as ET
 import hashlib
 from pathlib import Path
 from datetime import datetime
 import re
 from urllib.parse import urlparse
 import gzip
+import mmap
 import shutil
+from concurrent.futures import ThreadPoolExecutor
+from analyze_core_ontologies import (
+    analyze_ontology_cached, check_obo_foundry_availability, new_analysis_results,
+    prefetch_obo_foundry_availability, scan_rdf_xml, submit_analyses, summarize_analysis,
+    write_json
+)
+from enhanced_download import DOWNLOAD_CHUNK_SIZE, SESSION, flush_head_cache, open_gzip, url_exists
+from ontology_sources import (
+    ADDITIONAL_SECTION, CLOSURE_BASE_SECTION, CLOSURE_NON_BASE_SECTION, CORE_SECTION,
+    IN_HOUSE_SECTION, PYOBO_SECTION, get_source_file, ontology_name, parse_sections
+)
 
-def normalize_iri(iri):
-    """Normalize IRI to extract the base ontology prefix and standardize to lowercase."""
-    if not iri:
-        return None
-    
-    # Skip non-OBO IRIs
-    if 'obo' not in iri:
-        return None
-        
-    # Handle NCBITaxon special case
-    if 'NCBITaxon' in iri:
-        return 'http://purl.obolibrary.org/obo/ncbitaxon'
-        
-    # Extract ontology prefix for OBO terms
-    match = re.match(r'http://purl\.obolibrary\.org/obo/([A-Za-z]+)(?:_|#|\.|$)', iri)
-    if match:
-        return f"http://purl.obolibrary.org/obo/{match.group(1).lower()}"
+# Functional-syntax constructs the analysis needs, matched in one pass
+_OFN_RE = re.compile(rb'(Ontology|Import|Declaration\(Class|SubClassOf)\(<([^>]+)>')
+
+def scan_functional_syntax(buffer, short_name, results):
+    """Sweep an OWL functional-syntax document (bytes or mmap) into results."""
+    own_probe = f"/{short_name}_"
+    own_probe_hash = f"/{short_name}#"
+    own_terms = results['own_terms']
+    external_terms = results['external_terms']
+    subjects = set()
+    for match in _OFN_RE.finditer(buffer):
+        kind, raw_iri = match.groups()
+        if kind == b'SubClassOf':
+            # Classes that are subjects of SubClassOf axioms,
+            # kept as bytes so repeats are decoded only once
+            subjects.add(raw_iri)
+            continue
+        term_iri = raw_iri.decode('utf-8')
+        if kind == b'Declaration(Class':
+            # Declared classes
+            if own_probe in term_iri or own_probe_hash in term_iri:
+                own_terms.add(term_iri)
+            else:
+                external_terms.add(term_iri)
+        elif kind == b'Import':
+            results['has_imports'] = True
+        elif results['ontology_iri'] is None:
+            results['ontology_iri'] = term_iri
     
-    return None
+    # Declarations may follow the axioms, so match subjects at the end
+    results['external_terms_as_subjects'].update(
+        external_terms.intersection(iri.decode('utf-8') for iri in subjects)
+    )
+    return results
 
 def analyze_ontology(file_path):
     """Analyze a single ontology file."""
     try:
         # Remove duplicate print - we'll let the detailed results handle the output
-        
-        # Read file content
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # Check if file is in functional syntax format
-        is_functional_syntax = 'Prefix(' in content[:1000] or 'Ontology(' in content[:1000]
-        
+        is_gzipped = file_path.endswith('.gz')
         filename = os.path.basename(file_path)
-        if filename.endswith('.gz'):
+        if is_gzipped:
             filename = filename[:-3]
-        short_name = filename.split('.')[0].upper()
+        short_name = ontology_name(filename).upper()
         
-        results = {
-            'file': filename,
-            'has_imports': False,
-            'ontology_iri': None,
-            'own_terms': set(),
-            'external_terms': set(),
-            'external_terms_as_subjects': set()
-        }
+        results = new_analysis_results(filename)
         
-        if is_functional_syntax:
-            # Parse functional syntax
-            # Get ontology IRI
-            ontology_match = re.search(r'Ontology\(<([^>]+)>', content)
-            if ontology_match:
-                results['ontology_iri'] = ontology_match.group(1)
+        # The file is opened once, for both syntax detection and parsing
+        with (open_gzip(file_path) if is_gzipped else open(file_path, 'rb')) as f:
+            # Check if file is in functional syntax format from its first block only
+            head = f.read(4096)
+            is_functional_syntax = b'Prefix(' in head or b'Ontology(' in head
+            f.seek(0)
             
-            # Find imports if any
-            import_matches = re.findall(r'Import\(<([^>]+)>', content)
-            results['has_imports'] = len(import_matches) > 0
-            
-            # Find all declared classes
-            class_matches = re.findall(r'Declaration\(Class\(<([^>]+)>', content)
-            for term_iri in class_matches:
-                if f"/{short_name}_" in term_iri or f"/{short_name}#" in term_iri:
-                    results['own_terms'].add(term_iri)
+            if is_functional_syntax:
+                # Parse functional syntax in a single regex sweep over the
+                # raw bytes, without a Python-level loop per line
+                if is_gzipped:
+                    # Compressed files can't be memory-mapped
+                    scan_functional_syntax(f.read(), short_name, results)
                 else:
-                    results['external_terms'].add(term_iri)
-            
-            # Find classes that are subjects (appear in SubClassOf or other assertions)
-            subject_matches = re.findall(r'SubClassOf\(<([^>]+)>', content)
-            for term_iri in subject_matches:
-                if term_iri in results['external_terms']:
-                    results['external_terms_as_subjects'].add(term_iri)
-        else:
-            # Original XML parsing logic
-            try:
-                if file_path.endswith('.gz'):
-                    with gzip.open(file_path, 'rt', encoding='utf-8') as f:
-                        tree = ET.parse(f)
-                else:
-                    tree = ET.fromstring(content)
-                
-                namespaces = {
-                    'rdf': 'http://www.w3.org/1999/02/22-rdf-syntax-ns#',
-                    'owl': 'http://www.w3.org/2002/07/owl#',
-                    'rdfs': 'http://www.w3.org/2000/01/rdf-schema#'
-                }
-                
-                # Check for imports
-                imports = tree.findall('.//owl:imports', namespaces)
-                results['has_imports'] = len(imports) > 0
-                
-                # Get ontology IRI
-                ontology = tree.find('.//owl:Ontology', namespaces)
-                if ontology is not None:
-                    results['ontology_iri'] = ontology.get('{' + namespaces['rdf'] + '}about')
-                
-                # Analyze terms
-                for element in tree.findall('.//*[@rdf:about]', namespaces):
-                    term_iri = element.get('{' + namespaces['rdf'] + '}about')
-                    
-                    # Special handling for NCBITaxon
-                    if short_name == 'NCBITAXON':
-                        if 'NCBITaxon_' in term_iri or 'NCBITaxon#' in term_iri:
-                            results['own_terms'].add(term_iri)
-                            continue
-                    
-                    if f"/{short_name}_" in term_iri or f"/{short_name}#" in term_iri:
-                        results['own_terms'].add(term_iri)
-                    else:
-                        results['external_terms'].add(term_iri)
-                        if len(element) > 0:
-                            results['external_terms_as_subjects'].add(term_iri)
-                            
-            except ET.ParseError as e:
-                print(f"XML parsing failed, trying as functional syntax...")
-                return None
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        scan_functional_syntax(mm, short_name, results)
+            else:
+                # Anything else is RDF/XML; a parse error here means a broken
+                # file, so it is reported below rather than retried
+                scan_rdf_xml(f, short_name, results)
         
         return results
         
@@ -131,6 +93,11 @@ def analyze_ontology(file_path):
         print(f"Error analyzing {file_path}: {str(e)}")
         return None
 
+def analyze_and_summarize(file_path, cache_dir):
+    """Analyze a file in a worker process, returning only its summary."""
+    result = analyze_ontology_cached(file_path, cache_dir, analyze_ontology)
+    return summarize_analysis(result) if result is not None else None
+
 def check_obo_foundry_base_availability(onto_name):
     """Check if ontology has a base version in OBO Foundry."""
     if not onto_name:
@@ -144,24 +111,7 @@ def check_obo_foundry_base_availability(onto_name):
         onto_name = onto_name[:-5]
     
     base_url = f"http://purl.obolibrary.org/obo/{onto_name}/{onto_name}-base.owl"
-    try:
-        response = requests.head(base_url, allow_redirects=True, timeout=5)
-        return response.status_code == 200, base_url
-    except requests.RequestException:
-        return False, base_url
-
-def check_obo_foundry_availability(filename):
-    """Check if a -base version exists in OBO Foundry."""
-    short_name = filename.split('.')[0].lower()
-    if short_name.endswith('-base'):
-        short_name = short_name[:-5]
-    url = f"http://purl.obolibrary.org/obo/{short_name}/{short_name}-base.owl"
-    
-    try:
-        response = requests.head(url, allow_redirects=True, timeout=5)
-        return (response.status_code == 200, url)
-    except requests.RequestException:
-        return (False, url)
+    return url_exists(base_url), base_url
 
 def classify_ontology(analysis, filename):
     """Classify the ontology based on analysis results."""
@@ -178,9 +128,9 @@ def classify_ontology(analysis, filename):
     
     # Otherwise proceed with normal classification
     no_imports = not analysis['has_imports']
-    more_own_terms = len(analysis['own_terms']) > len(analysis['external_terms'])
+    more_own_terms = analysis['own_terms_count'] > analysis['external_terms_count']
     base_hint = "base" in filename.lower()
-    high_own_term_ratio = len(analysis['own_terms']) / (len(analysis['external_terms']) + 1) > 10
+    high_own_term_ratio = analysis['own_terms_count'] / (analysis['external_terms_count'] + 1) > 10
     
     if base_hint and no_imports:
         return f"Base.{base_version_info}"
@@ -190,40 +140,38 @@ def classify_ontology(analysis, filename):
         return f"Non-Base.{base_version_info}"
 
 def download_and_process_ontology(url, output_path, is_base=False):
-    """Download an ontology file and process it if it's gzipped."""
+    """Download an ontology file, decompressing it on the fly if it's gzipped."""
+    part_path = None
     try:
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-        
-        # Determine correct output directory
-        if not is_base and '-base' not in os.path.basename(output_path):
-            # Make sure we're not creating a nested non-base-ontologies directory
-            if 'non-base-ontologies' not in output_path:
-                output_dir = os.path.join(os.path.dirname(output_path), 'non-base-ontologies')
-                os.makedirs(output_dir, exist_ok=True)
-                output_path = os.path.join(output_dir, os.path.basename(output_path))
-        
-        if url.endswith('.gz'):
-            # Save compressed file temporarily
-            gz_path = output_path + '.gz'
-            with open(gz_path, 'wb') as f:
-                f.write(response.content)
+        with SESSION.get(url, stream=True, timeout=30) as response:
+            response.raise_for_status()
             
-            # Decompress
-            with gzip.open(gz_path, 'rb') as f_in:
-                with open(output_path, 'wb') as f_out:
-                    shutil.copyfileobj(f_in, f_out)
+            # Determine correct output directory
+            if not is_base and '-base' not in os.path.basename(output_path):
+                # Make sure we're not creating a nested non-base-ontologies directory
+                if 'non-base-ontologies' not in output_path:
+                    output_dir = os.path.join(os.path.dirname(output_path), 'non-base-ontologies')
+                    os.makedirs(output_dir, exist_ok=True)
+                    output_path = os.path.join(output_dir, os.path.basename(output_path))
             
-            # Remove compressed file
-            os.remove(gz_path)
+            # Stream straight to disk; only the transfer encoding is undone by
+            # urllib3, a .gz payload is decompressed by GzipFile on the way
+            response.raw.decode_content = True
+            source = gzip.GzipFile(fileobj=response.raw) if url.endswith('.gz') else response.raw
+            part_path = output_path + '.part'
+            with open(part_path, 'wb') as f:
+                shutil.copyfileobj(source, f, DOWNLOAD_CHUNK_SIZE)
+            os.replace(part_path, output_path)
+        
+        if url.endswith('.gz'):
             print(f"Successfully downloaded and decompressed: {os.path.basename(output_path)}")
         else:
-            with open(output_path, 'wb') as f:
-                f.write(response.content)
             print(f"Successfully downloaded: {os.path.basename(output_path)}")
         return True
     except Exception as e:
         print(f"Error downloading {url}: {str(e)}")
+        if part_path and os.path.exists(part_path):
+            os.remove(part_path)
         return False
 
 def read_core_external_terms(repo_path):
@@ -240,50 +188,31 @@ def read_core_external_terms(repo_path):
 
 def get_core_ontologies(ontologies_txt):
     """Extract core ontology names from ontologies_source.txt."""
-    core_ontos = set()
     try:
         # First try with ontologies_source.txt
         try:
-            with open(ontologies_txt, 'r') as f:
-                in_core_section = False
-                for line in f:
-                    if line.strip() == "#Core Ontologies from OBO Foundry":
-                        in_core_section = True
-                    elif line.startswith('#'):
-                        in_core_section = False
-                    elif in_core_section and line.strip():
-                        # Extract ontology name from URL
-                        onto_name = line.strip().split('/')[-1].split('.')[0]
-                        core_ontos.add(onto_name)
+            sections = parse_sections(ontologies_txt)
         except FileNotFoundError:
             # If not found, try with ontologies.txt
             old_path = os.path.join(os.path.dirname(ontologies_txt), 'ontologies.txt')
-            with open(old_path, 'r') as f:
-                in_core_section = False
-                for line in f:
-                    if line.strip() == "#Core Ontologies from OBO Foundry":
-                        in_core_section = True
-                    elif line.startswith('#'):
-                        in_core_section = False
-                    elif in_core_section and line.strip():
-                        # Extract ontology name from URL
-                        onto_name = line.strip().split('/')[-1].split('.')[0]
-                        core_ontos.add(onto_name)
+            sections = parse_sections(old_path)
             
             # Copy the content to the new filename
             import shutil
             shutil.copy2(old_path, ontologies_txt)
             print(f"Copied ontologies.txt to {ontologies_txt}")
+        
+        # Extract ontology names from URLs
+        return frozenset(ontology_name(url) for url in sections.get(CORE_SECTION, []))
             
     except Exception as e:
         print(f"Error reading ontologies file: {str(e)}")
-    return core_ontos
+    return frozenset()
 
 def update_ontologies_txt(repo_path, non_base_urls, base_urls):
     """Update ontologies_source.txt with new ontology URLs."""
     # Use environment variable to support test mode
-    source_file = os.environ.get('ONTOLOGIES_SOURCE_FILE', 'ontologies_source.txt')
-    ontologies_txt = os.path.join(repo_path, source_file)
+    ontologies_txt = get_source_file(repo_path)
     
     # Read existing content
     try:
@@ -298,70 +227,58 @@ def update_ontologies_txt(repo_path, non_base_urls, base_urls):
         except FileNotFoundError:
             # If neither file exists, create a basic structure
             lines = [
-                "#Core Ontologies from OBO Foundry\n",
+                f"#{CORE_SECTION}\n",
                 "\n",
-                "#Core closure ontologies non base version\n",
+                f"#{CLOSURE_NON_BASE_SECTION}\n",
                 "\n",
-                "#Core closure ontologies -base version\n",
+                f"#{CLOSURE_BASE_SECTION}\n",
                 "\n",
-                "#Additional OBO Foundry ontologies\n",
+                f"#{ADDITIONAL_SECTION}\n",
                 "\n",
-                "#PyOBO Controlled Vocabularies and Ontologies\n",
+                f"#{PYOBO_SECTION}\n",
                 "\n",
                 "#In-house Ontologies (manually added to ontologies_data_owl)\n"
             ]
     
-    # Find sections
-    non_base_section_index = -1
-    base_section_index = -1
-    for i, line in enumerate(lines):
-        if line.strip() == "#Core closure ontologies non base version":
-            non_base_section_index = i
-        elif line.strip() == "#Core closure ontologies -base version":
-            base_section_index = i
+    non_base_header = f"#{CLOSURE_NON_BASE_SECTION}"
+    base_header = f"#{CLOSURE_BASE_SECTION}"
     
-    if non_base_section_index == -1 or base_section_index == -1:
-        core_section_index = -1
-        for i, line in enumerate(lines):
-            if line.strip() == "#Core Ontologies from OBO Foundry":
-                core_section_index = i
-                break
-        
-        if core_section_index != -1:
-            insert_index = core_section_index
+    # Add the closure sections if either is missing
+    stripped = [line.strip() for line in lines]
+    if non_base_header not in stripped or base_header not in stripped:
+        core_header = f"#{CORE_SECTION}"
+        if core_header in stripped:
+            insert_index = stripped.index(core_header)
             while insert_index < len(lines) and not lines[insert_index].startswith('#'):
                 insert_index += 1
             
-            lines.insert(insert_index, "\n#Core closure ontologies non base version\n")
-            lines.insert(insert_index + 1, "#Core closure ontologies -base version\n")
-            non_base_section_index = insert_index
-            base_section_index = insert_index + 1
+            lines.insert(insert_index, f"\n{non_base_header}\n")
+            lines.insert(insert_index + 1, f"{base_header}\n")
     
-    # Create new section contents
-    non_base_lines = sorted(url + '\n' for url in non_base_urls if not '-base.owl' in url)
-    base_lines = sorted(url + '\n' for url in base_urls if '-base.owl' in url)
+    # New section contents, keyed by header
+    section_lines = {
+        non_base_header: [url + '\n' for url in sorted(non_base_urls) if '-base.owl' not in url],
+        base_header: [url + '\n' for url in sorted(base_urls) if '-base.owl' in url],
+    }
     
-    # Remove everything between sections and add new content
+    # Replace everything under the closure headers with the new content
     new_lines = []
-    current_section = None
+    keep = True
     for line in lines:
-        if line.strip() == "#Core closure ontologies non base version":
-            new_lines.append(line)
-            new_lines.extend(non_base_lines)
-            current_section = "non_base"
-        elif line.strip() == "#Core closure ontologies -base version":
+        header = line.strip()
+        if header in section_lines:
             new_lines.append(line)
-            new_lines.extend(base_lines)
-            current_section = "base"
+            new_lines.extend(section_lines[header])
+            keep = False
         elif line.startswith('#'):
-            current_section = None
             new_lines.append(line)
-        elif current_section is None:
+            keep = True
+        elif keep:
             new_lines.append(line)
     
-    # Write updated content
+    # Write updated content in one call
     with open(ontologies_txt, 'w') as f:
-        f.writelines(new_lines)
+        f.write(''.join(new_lines))
         
 def analyze_non_core_ontologies(repo_path):
     """Main function to analyze non-core ontologies."""
@@ -372,8 +289,7 @@ def analyze_non_core_ontologies(repo_path):
     ontology_data_path, _, outputs_path, version_dir = get_output_directories(repo_path, test_mode)
     
     # Use environment variable to support test mode
-    source_file = os.environ.get('ONTOLOGIES_SOURCE_FILE', 'ontologies_source.txt')
-    ontologies_txt = os.path.join(repo_path, source_file)
+    ontologies_txt = get_source_file(repo_path)
     non_base_dir = os.path.join(ontology_data_path, 'non-base-ontologies')
     
     # Create necessary directories
@@ -382,19 +298,11 @@ def analyze_non_core_ontologies(repo_path):
     os.makedirs(outputs_path, exist_ok=True)
     
     # Read core ontologies list
-    core_ontos = set()
+    core_ontos = frozenset()
     try:
-        with open(ontologies_txt, 'r') as f:
-            in_core_section = False
-            for line in f:
-                if line.strip() == "#Core Ontologies from OBO Foundry":
-                    in_core_section = True
-                elif line.startswith('#'):
-                    in_core_section = False
-                elif in_core_section and line.strip():
-                    # Extract ontology name without extension or -base suffix
-                    onto_name = os.path.basename(line.strip()).split('.')[0].replace('-base', '')
-                    core_ontos.add(onto_name)
+        # Ontology names without extension or -base suffix
+        core_ontos = frozenset(ontology_name(url).replace('-base', '')
+                               for url in parse_sections(ontologies_txt).get(CORE_SECTION, []))
     except Exception as e:
         print(f"Error reading core ontologies: {str(e)}")
 
@@ -407,17 +315,19 @@ def analyze_non_core_ontologies(repo_path):
     non_base_urls = set()
     base_urls = set()
     
-    # Process external terms
+    # Work out which ontologies the external terms point to, skipping core ontologies
+    onto_names = set()
     for term in external_terms:
+        # Extract ontology name from IRI
+        onto_name = term.rpartition('/')[2].lower()
+        
+        # Skip if it's a core ontology - handle both .owl and -base.owl versions
+        if onto_name.replace('-base', '') not in core_ontos:
+            onto_names.add(onto_name)
+    
+    def fetch_ontology(onto_name):
+        """Check for a -base version and download whichever version applies."""
         try:
-            # Extract ontology name from IRI
-            onto_name = term.split('/')[-1].lower()
-            
-            # Skip if it's a core ontology - handle both .owl and -base.owl versions
-            onto_base = onto_name.replace('-base', '') if '-base' in onto_name else onto_name
-            if onto_base in core_ontos:
-                continue
-            
             # Check for base version availability
             has_base, base_url = check_obo_foundry_base_availability(onto_name)
             
@@ -425,7 +335,7 @@ def analyze_non_core_ontologies(repo_path):
                 # Download base version
                 filename = f"{onto_name}-base.owl"
                 output_path = os.path.join(ontology_data_path, filename)
-                if not os.path.exists(output_path):
+                if filename not in existing_files:
                     print(f"Downloading base version of {onto_name}...")
                     if download_and_process_ontology(base_url, output_path, is_base=True):
                         base_urls.add(base_url)
@@ -437,7 +347,7 @@ def analyze_non_core_ontologies(repo_path):
                 regular_url = f"http://purl.obolibrary.org/obo/{onto_name}.owl"
                 filename = f"{onto_name}.owl"
                 output_path = os.path.join(ontology_data_path, filename)
-                if not os.path.exists(output_path):
+                if filename not in existing_files:
                     print(f"Downloading regular version of {onto_name}...")
                     if download_and_process_ontology(regular_url, output_path):
                         non_base_urls.add(regular_url)
@@ -446,8 +356,17 @@ def analyze_non_core_ontologies(repo_path):
                     non_base_urls.add(regular_url)
         
         except Exception as e:
-            print(f"Error processing term {term}: {str(e)}")
-            continue
+            print(f"Error processing ontology {onto_name}: {str(e)}")
+    
+    # One directory scan instead of a stat per ontology
+    existing_files = {entry.name for entry in os.scandir(ontology_data_path) if entry.is_file()}
+    
+    # HEAD checks and downloads are network-bound, so overlap them on the
+    # shared keep-alive session instead of paying each round trip in turn
+    max_workers = max(1, int(os.environ.get('PARALLEL_DOWNLOADS', '10')))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(fetch_ontology, sorted(onto_names)))
+    flush_head_cache()
     
     # Update ontologies.txt
     print("\nUpdating ontologies.txt...")
@@ -455,96 +374,89 @@ def analyze_non_core_ontologies(repo_path):
     
     # Process Additional OBO Foundry, PyOBO and In-house ontologies
     print("\nProcessing Additional OBO Foundry, PyOBO and In-house ontologies...")
-    additional_ontologies = []
-    current_section = ""
-    
-    with open(ontologies_txt, 'r') as f:
-        for line in f:
-            line = line.strip()
-            if line.startswith('#'):
-                current_section = line
-            elif line and (current_section in ["#PyOBO Controlled Vocabularies and Ontologies", 
-                                             "#In-house Ontologies",
-                                             "#Additional OBO Foundry ontologies"]):
-                additional_ontologies.append(line)
+    additional_sections = (PYOBO_SECTION, IN_HOUSE_SECTION, ADDITIONAL_SECTION)
+    additional_ontologies = [url for section, entries in parse_sections(ontologies_txt).items()
+                             if section in additional_sections for url in entries]
     
     # Download and verify additional ontologies
+    existing_non_base = {entry.name for entry in os.scandir(non_base_dir) if entry.is_file()}
     for url in additional_ontologies:
         filename = os.path.basename(url)
-        if filename.endswith('.gz'):
-            output_path = os.path.join(ontology_data_path, 'non-base-ontologies', filename[:-3])
-        else:
-            output_path = os.path.join(ontology_data_path, 'non-base-ontologies', filename)
+        output_name = filename[:-3] if filename.endswith('.gz') else filename
         
-        if os.path.exists(output_path):
-            print(f"Additional ontology {os.path.basename(output_path)} already exists")
+        if output_name in existing_non_base:
+            print(f"Additional ontology {output_name} already exists")
         else:
             print(f"Downloading {filename}...")
-            download_and_process_ontology(url, output_path)
+            if download_and_process_ontology(url, os.path.join(non_base_dir, output_name)):
+                existing_non_base.add(output_name)
 
     print("\nAnalyzing non-core ontologies...")
     analysis_results = []
     
-    # Helper function to analyze and print results
-    def analyze_and_print_results(file_path):
+    # Helper function to print analysis results
+    def print_results(file_path, result):
         filename = os.path.basename(file_path)
-        # Skip core ontologies
-        if filename in core_ontos:
-            return
-            
         print(f"\nFile: {filename}")
-        result = analyze_ontology(file_path)
         if result:
             classification = classify_ontology(result, filename)
             json_result = {
                 "file_name": result['file'],
                 "has_imports": result['has_imports'],
                 "ontology_iri": result['ontology_iri'],
-                "own_terms_count": len(result['own_terms']),
-                "external_terms_count": len(result['external_terms']),
+                "own_terms_count": result['own_terms_count'],
+                "external_terms_count": result['external_terms_count'],
                 "classification": classification,
-                "external_terms_as_subjects": sorted(list(result['external_terms_as_subjects']))[:5],
-                "own_terms": sorted(list(result['own_terms']))[:5],
-                "external_terms": sorted(list(result['external_terms']))[:5]
+                "external_terms_as_subjects": result['external_terms_as_subjects'],
+                "own_terms": result['own_terms'],
+                "external_terms": result['external_terms']
             }
             analysis_results.append(json_result)
             
             print(f"  Has imports: {'Yes' if result['has_imports'] else 'No'}")
             print(f"  Ontology IRI: {result['ontology_iri']}")
-            print(f"  Own terms: {len(result['own_terms'])}")
-            print(f"  External terms: {len(result['external_terms'])}")
+            print(f"  Own terms: {result['own_terms_count']}")
+            print(f"  External terms: {result['external_terms_count']}")
             print(f"  Classification: {classification}")
             
             if result['external_terms_as_subjects']:
                 print("  External Terms Subject of Triples? Yes")
-                print(f"  Number of external terms that are subjects of triples: {len(result['external_terms_as_subjects'])}")
+                print(f"  Number of external terms that are subjects of triples: {result['external_terms_as_subjects_count']}")
                 print("  First 5 external terms that are subject of triples:")
-                for term in sorted(list(result['external_terms_as_subjects']))[:5]:
+                for term in result['external_terms_as_subjects']:
                     print(f"    {term}")
             else:
                 print("  External Terms Subject of Triples? No")
             
             print("  First 5 own terms:")
-            for term in sorted(list(result['own_terms']))[:5]:
+            for term in result['own_terms']:
                 print(f"    {term}")
             
             print("  First 5 external terms:")
-            for term in sorted(list(result['external_terms']))[:5]:
+            for term in result['external_terms']:
                 print(f"    {term}")
     
-    # Only analyze non-base directory contents
+    # Only analyze non-base directory contents, skipping core ontologies
     print("\nAnalyzing non-core ontologies:")
+    file_paths = []
     if os.path.exists(non_base_dir):
-        for filename in sorted(os.listdir(non_base_dir)):
-            if filename.endswith(('.owl', '.ofn', '.obo')):
-                file_path = os.path.join(non_base_dir, filename)
-                analyze_and_print_results(file_path)
+        file_paths = [os.path.join(non_base_dir, filename)
+                      for filename in sorted(os.listdir(non_base_dir))
+                      if filename.endswith(('.owl', '.ofn', '.obo')) and filename not in core_ontos]
+    
+    # Files are parsed in parallel; classification and output stay in order here
+    cache_dir = os.path.join(outputs_path, '.cache')
+    os.makedirs(cache_dir, exist_ok=True)
+    analyses = submit_analyses(analyze_and_summarize, file_paths, cache_dir)
+    prefetch_obo_foundry_availability(os.path.basename(path) for path in file_paths)
+    for file_path in file_paths:
+        print_results(file_path, analyses.pop(file_path).result())
     
     # Save analysis results
     json_path = os.path.join(outputs_path, 'non_core_ontologies_analysis.json')
-    with open(json_path, 'w') as f:
-        json.dump(analysis_results, f, indent=2)
+    write_json(json_path, analysis_results)
     
+    flush_head_cache()
     print("\nAnalysis complete!")
 
 if __name__ == "__main__":
@@ -1,11 +1,33 @@
 import os
 import subprocess
 import re
-import gzip
 import tempfile
 import shutil
 from collections import defaultdict
-from typing import Dict, Set, List, Tuple
+from contextlib import contextmanager
+from typing import Dict, Set, List, Tuple, Optional
+from enhanced_download import open_gzip
+
+try:
+    import pyoxigraph as ox
+except ImportError:
+    ox = None
+
+# Last path segment before a separator, e.g. 'GO' in .../obo/GO_0008150
+_PATH_RE = re.compile(r'.*[/#]([^/#_]+)[_/#]')
+_SPLIT_RE = re.compile(r'[/#]')
+# Prefix declarations in a file header: RDF/XML xmlns, Turtle @prefix,
+# functional syntax Prefix(...) and OWL/XML <Prefix name=... IRI=.../>
+_PREFIX_DECL_RE = re.compile(
+    rb'xmlns:(\w+)\s*=\s*"([^"]+)"'
+    rb'|@prefix\s+(\w+):\s+<([^>]+)>'
+    rb'|Prefix\(\s*(\w+):=<([^>]+)>\)'
+    rb'|<Prefix\s+name\s*=\s*"(\w+)"\s+IRI\s*=\s*"([^"]+)"'
+)
+# Declarations ROBOT writes when converting to Turtle
+_TURTLE_PREFIX_RE = re.compile(r'@prefix\s+(\w+):\s+<([^>]+)>')
+# Declarations sit at the top of the file
+PREFIX_HEADER_BYTES = 1 << 16
 
 def decompress_if_needed(file_path: str) -> str:
     """
@@ -17,12 +39,32 @@ def decompress_if_needed(file_path: str) -> str:
             tempfile.gettempdir(),
             os.path.basename(file_path)[:-3]  # Remove .gz extension
         )
-        with gzip.open(file_path, 'rb') as f_in:
+        with open_gzip(file_path) as f_in:
             with open(temp_path, 'wb') as f_out:
                 shutil.copyfileobj(f_in, f_out)
         return temp_path
     return file_path
 
+@contextmanager
+def decompressed(file_path: str):
+    """Yield a path ROBOT can read, removing any temporary copy afterwards."""
+    actual_path = decompress_if_needed(file_path)
+    try:
+        yield actual_path
+    finally:
+        # Clean up temporary file if one was created
+        if actual_path != file_path:
+            try:
+                os.remove(actual_path)
+            except OSError:
+                pass
+
+def open_ontology(file_path: str):
+    """Open an ontology for binary reading, decompressing .gz on the fly."""
+    if file_path.endswith('.gz'):
+        return open_gzip(file_path)
+    return open(file_path, 'rb')
+
 def get_robot_path(repo_path: str) -> str:
     """Get the full path to the ROBOT executable."""
     robot_path = shutil.which('robot')
@@ -36,14 +78,14 @@ def extract_prefix_from_iri(iri: str) -> Tuple[str, str]:
     Returns (prefix, base_iri)
     """
     # Try to extract prefix from IRI path
-    path_match = re.match(r'.*[/#]([^/#_]+)[_/#]', iri)
+    path_match = _PATH_RE.match(iri)
     if path_match:
         prefix = path_match.group(1).upper()
         base_iri = iri[:path_match.end(1)]
         return prefix, base_iri
     
     # If no match, try to get the last meaningful part of the URL
-    parts = re.split(r'[/#]', iri)
+    parts = _SPLIT_RE.split(iri)
     meaningful_parts = [p for p in parts if p and not p.isdigit()]
     if meaningful_parts:
         prefix = meaningful_parts[-1].upper()
@@ -52,76 +94,149 @@ def extract_prefix_from_iri(iri: str) -> Tuple[str, str]:
     
     return "", iri
 
-def analyze_ontology_prefixes(file_path: str, robot_path: str) -> Tuple[Set[str], Dict[str, Set[str]]]:
+def read_declared_prefixes(file_path: str) -> List[Tuple[str, str]]:
     """
-    Analyze an ontology file for prefixes and IRIs using ROBOT.
+    Return (prefix, IRI) pairs declared in the header of an ontology file.
+    
+    Only the first PREFIX_HEADER_BYTES are read, which is where RDF/XML,
+    Turtle, functional syntax and OWL/XML put their namespace declarations.
     """
-    try:
-        # Decompress if needed
-        actual_path = decompress_if_needed(file_path)
-        
-        prefixes = set()
-        prefix_to_iris = defaultdict(set)
-        
-        # Query for all IRIs used in the ontology
+    with open_ontology(file_path) as f:
+        header = f.read(PREFIX_HEADER_BYTES)
+    declared = []
+    for match in _PREFIX_DECL_RE.finditer(header):
+        prefix, iri = [group for group in match.groups() if group is not None]
+        declared.append((prefix.decode(), iri.decode()))
+    return declared
+
+def convert_prefixes_with_robot(file_path: str, robot_path: str) -> List[Tuple[str, str]]:
+    """
+    Return the (prefix, IRI) pairs ROBOT declares when converting the file
+    to Turtle, for formats such as OBO that have no parsable header.
+    """
+    with decompressed(file_path) as actual_path:
         cmd = [
-            robot_path, 'query',
-            '--input', actual_path,
-            '--query', '''
-                PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-                PREFIX owl: <http://www.w3.org/2002/07/owl#>
-                SELECT DISTINCT ?s
-                WHERE {
-                    { ?s ?p ?o }
-                    UNION
-                    { ?x ?s ?o }
-                    UNION
-                    { ?x ?p ?s }
-                    FILTER(isIRI(?s))
-                }
-            ''',
-            '--format', 'csv'
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        if result.returncode == 0:
-            # Process each IRI found
-            for line in result.stdout.split('\n')[1:]:  # Skip header
-                if line.strip():
-                    iri = line.strip().strip('"')
-                    if iri.startswith('http'):
-                        prefix, base_iri = extract_prefix_from_iri(iri)
-                        if prefix:
-                            prefixes.add(prefix)
-                            prefix_to_iris[prefix].add(base_iri)
-        
-        # Also try to get explicit prefix declarations from the ontology
-        cmd_ttl = [
             robot_path, 'convert',
             '--input', actual_path,
             '--format', 'ttl',
             '--output', '-'
         ]
+        result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        return []
+    return _TURTLE_PREFIX_RE.findall(result.stdout)
+
+# Extensions pyoxigraph can parse directly; anything else goes through ROBOT
+_OXIGRAPH_FORMATS = {
+    '.owl': 'RDF_XML',
+    '.rdf': 'RDF_XML',
+    '.ttl': 'TURTLE',
+}
+
+IRI_QUERY = '''
+    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+    PREFIX owl: <http://www.w3.org/2002/07/owl#>
+    SELECT DISTINCT ?s
+    WHERE {
+        { ?s ?p ?o }
+        UNION
+        { ?x ?s ?o }
+        UNION
+        { ?x ?p ?s }
+        FILTER(isIRI(?s))
+    }
+'''
+
+def parse_quads(f, rdf_format):
+    """Parse f leniently with pyoxigraph; early 0.4.x releases lack lenient=."""
+    try:
+        return ox.parse(f, format=rdf_format, lenient=True)
+    except TypeError:
+        return ox.parse(f, format=rdf_format)
+
+def scan_iris(file_path: str) -> Optional[Set[str]]:
+    """
+    Collect every IRI used as subject, predicate or object by parsing the
+    file in-process with pyoxigraph, avoiding a JVM start per file.
+    
+    Returns None when pyoxigraph is not installed or cannot parse the file
+    (e.g. OBO, functional syntax or OWL/XML), so the caller can fall back
+    to ROBOT. Gzipped files are read as a stream.
+    """
+    if ox is None:
+        return None
+    inner_path = file_path[:-3] if file_path.endswith('.gz') else file_path
+    format_name = _OXIGRAPH_FORMATS.get(os.path.splitext(inner_path)[1])
+    if format_name is None:
+        return None
+    
+    iris = set()
+    try:
+        # .gz files are decompressed as a stream, never written to disk
+        with open_ontology(file_path) as f:
+            for quad in parse_quads(f, getattr(ox.RdfFormat, format_name)):
+                for term in (quad.subject, quad.predicate, quad.object):
+                    if isinstance(term, ox.NamedNode):
+                        iris.add(term.value)
+    except (SyntaxError, ValueError, OSError) as e:
+        print(f"pyoxigraph could not parse {os.path.basename(file_path)} ({e}); using ROBOT")
+        return None
+    return iris
+
+def query_iris_with_robot(file_path: str, robot_path: str) -> List[str]:
+    """Collect every IRI in the ontology with a ROBOT SPARQL query."""
+    cmd = [
+        robot_path, 'query',
+        '--input', file_path,
+        '--query', IRI_QUERY,
+        '--format', 'csv'
+    ]
+    
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        return []
+    
+    iris = []
+    for line in result.stdout.split('\n')[1:]:  # Skip header
+        if line.strip():
+            iris.append(line.strip().strip('"'))
+    return iris
+
+def analyze_ontology_prefixes(file_path: str, robot_path: str) -> Tuple[Set[str], Dict[str, Set[str]]]:
+    """
+    Analyze an ontology file for prefixes and IRIs, using pyoxigraph when it
+    can parse the file and ROBOT otherwise.
+    """
+    try:
+        prefixes = set()
+        prefix_to_iris = defaultdict(set)
         
-        ttl_result = subprocess.run(cmd_ttl, capture_output=True, text=True)
+        # Collect all IRIs used in the ontology, in-process when possible;
+        # only ROBOT needs a decompressed copy of a .gz file on disk
+        iris = scan_iris(file_path)
+        if iris is None:
+            with decompressed(file_path) as actual_path:
+                iris = query_iris_with_robot(actual_path, robot_path)
         
-        if ttl_result.returncode == 0:
-            # Look for explicit prefix declarations in Turtle format
-            prefix_pattern = re.compile(r'@prefix\s+(\w+:)\s+<([^>]+)>')
-            for match in prefix_pattern.finditer(ttl_result.stdout):
-                prefix, iri = match.groups()
-                prefix = prefix.rstrip(':').upper()
-                prefixes.add(prefix)
-                prefix_to_iris[prefix].add(iri)
+        # Process each IRI found
+        for iri in iris:
+            if iri.startswith('http'):
+                prefix, base_iri = extract_prefix_from_iri(iri)
+                if prefix:
+                    prefixes.add(prefix)
+                    prefix_to_iris[prefix].add(base_iri)
+        
+        # Also get explicit prefix declarations from the file header, rather
+        # than a second ROBOT run converting the whole ontology to Turtle;
+        # formats without a recognised header (e.g. OBO) still use ROBOT
+        declared = read_declared_prefixes(file_path)
+        if not declared:
+            declared = convert_prefixes_with_robot(file_path, robot_path)
+        for prefix, iri in declared:
+            prefix = prefix.upper()
+            prefixes.add(prefix)
+            prefix_to_iris[prefix].add(iri)
         
-        # Clean up temporary file if one was created
-        if actual_path != file_path:
-            try:
-                os.remove(actual_path)
-            except OSError:
-                pass
-                
         return prefixes, prefix_to_iris
         
     except subprocess.CalledProcessError as e:
@@ -1,35 +1,117 @@
 # create_pseudo_base_ontology.py
 import os
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import re
 from enhanced_download import get_output_directories, is_test_mode
+from ontology_sources import PYOBO_SECTION, get_source_file, ontology_name, parse_sections
 
 def extract_prefix_from_filename(filename):
     """Extract ontology prefix from filename."""
     # Remove extension and -base suffix if present
-    base_name = filename.split('.')[0].replace('-base', '')
+    base_name = ontology_name(filename).replace('-base', '')
     # Convert to uppercase for prefix
     return f"http://purl.obolibrary.org/obo/{base_name.upper()}_"
 
-def is_pyobo_ontology(filename, repo_path):
-    """Check if the ontology is from PyOBO section."""
-    source_file = os.environ.get('ONTOLOGIES_SOURCE_FILE', 'ontologies_source.txt')
-    ontologies_txt = os.path.join(repo_path, source_file)
+def load_pyobo_filenames(repo_path):
+    """File names of the PyOBO section of the source list.
+    
+    .gz sources are stored decompressed, so both names are included.
+    """
     try:
-        with open(ontologies_txt, 'r') as f:
-            in_pyobo_section = False
-            for line in f:
-                if line.strip() == "#PyOBO Controlled Vocabularies and Ontologies":
-                    in_pyobo_section = True
-                elif line.startswith('#'):
-                    in_pyobo_section = False
-                elif in_pyobo_section and line.strip():
-                    if filename in line:
-                        return True
+        urls = parse_sections(get_source_file(repo_path)).get(PYOBO_SECTION, [])
     except Exception as e:
         print(f"Error checking PyOBO status: {str(e)}")
-    return False
+        return frozenset()
+    filenames = set()
+    for url in urls:
+        filename = os.path.basename(url)
+        filenames.add(filename)
+        if filename.endswith('.gz'):
+            filenames.add(filename[:-3])
+    return frozenset(filenames)
+
+def is_pyobo_ontology(filename, repo_path, pyobo_filenames=None):
+    """Check if the ontology is from PyOBO section."""
+    if pyobo_filenames is None:
+        pyobo_filenames = load_pyobo_filenames(repo_path)
+    return filename in pyobo_filenames
+
+def build_robot_command(input_path, base_iri, output_path):
+    """ROBOT command that strips external axioms and imports from an ontology."""
+    # Improved parameters matching the Makefile approach
+    return [
+        'robot', 'remove',
+        '--input', input_path,
+        '--base-iri', base_iri,
+        '--axioms', 'external',
+        '--preserve-structure', 'false',
+        '--trim', 'false',
+        'remove', '--select', 'imports',
+        '--trim', 'false',
+        '--output', output_path
+    ]
+
+def tail_file(path, max_lines=20):
+    """Last max_lines lines of a text file, or '' if it can't be read."""
+    try:
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - 64 * 1024))
+            return b''.join(f.readlines()[-max_lines:]).decode(errors='replace')
+    except OSError:
+        return ''
+
+def run_robot(filename, base_filename, robot_command, repo_path, enable_monitoring, log_dir, env=None):
+    """Run one ROBOT command, returning True if the base version was created.
+    
+    ROBOT's stdout goes straight to log_dir/ROBOT_base_<filename>.log rather
+    than through a pipe into Python; only stderr is captured for errors.
+    env, if given, is the environment for the child process.
+    """
+    log_path = os.path.join(log_dir, f'ROBOT_base_{filename}.log')
+    print(f"Executing command:\n{' '.join(robot_command)}")
+    
+    # Run ROBOT command with optional memory monitoring
+    try:
+        if enable_monitoring:
+            # Use memory monitor for this individual ROBOT operation
+            monitor_script = os.path.join(os.path.dirname(__file__), 'memory_monitor.py')
+            monitor_command = [
+                'python3', monitor_script,
+                f'ROBOT_base_{filename}',
+                ' '.join(robot_command),
+                repo_path,
+                str(os.getenv('MEMORY_MONITOR_INTERVAL', '15'))
+            ]
+            subprocess.run(monitor_command, check=True, env=env)
+        else:
+            # Run ROBOT command normally, logging its stdout to a file
+            with open(log_path, 'wb') as log_file:
+                subprocess.run(
+                    robot_command,
+                    check=True,
+                    stdout=log_file,
+                    stderr=subprocess.PIPE,
+                    env=env
+                )
+            print(f"ROBOT log: {log_path}")
+        
+        print(f"Created base version for {filename}: {base_filename}")
+        return True
+    except subprocess.CalledProcessError as e:
+        print(f"Error processing {filename}:")
+        if e.stderr:
+            print("STDERR:", e.stderr.decode(errors='replace'))
+        if not enable_monitoring:
+            log_tail = tail_file(log_path)
+            if log_tail:
+                print(f"STDOUT (end of {log_path}):")
+                print(log_tail)
+        print("\nFull command that failed:")
+        print(' '.join(robot_command) if not enable_monitoring else f"Memory-monitored command for {filename}")
+        return False
 
 def create_pseudo_base_ontologies(repo_path):
     """Create pseudo base versions of non-base ontologies."""
@@ -54,35 +136,56 @@ def create_pseudo_base_ontologies(repo_path):
         
         print(f"Using ROBOT at: {robot_path}")
         
-        # Use environment variable for Java memory arguments or set default
-        if 'ROBOT_JAVA_ARGS' not in os.environ:
-            os.environ['ROBOT_JAVA_ARGS'] = '-Xmx32g -XX:MaxMetaspaceSize=4g'
-        print(f"ROBOT memory settings: {os.environ['ROBOT_JAVA_ARGS']}")
+        # Each ROBOT gets the full ROBOT_JAVA_ARGS heap, so only run several
+        # at once when ROBOT_PARALLEL_JOBS says the machine can hold them
+        max_workers = max(1, int(os.environ.get('ROBOT_PARALLEL_JOBS', '1')))
+        
+        # Use environment variable for Java memory arguments or set default;
+        # the default 32g budget is shared between the parallel jobs. It goes
+        # in the children's environment only, so later steps in this process
+        # (the merge) don't inherit it.
+        robot_env = dict(os.environ)
+        if 'ROBOT_JAVA_ARGS' not in robot_env:
+            heap_gb = max(1, 32 // max_workers)
+            robot_env['ROBOT_JAVA_ARGS'] = f'-Xmx{heap_gb}g -XX:MaxMetaspaceSize=4g'
+        print(f"ROBOT memory settings: {robot_env['ROBOT_JAVA_ARGS']}")
+        
+        # ROBOT logs sit next to the memory monitor logs
+        log_dir = os.path.join(outputs_path, 'utils')
+        os.makedirs(log_dir, exist_ok=True)
         
         # Check if memory monitoring is enabled
         enable_monitoring = os.getenv('ENABLE_MEMORY_MONITORING', 'false').lower() == 'true'
         if enable_monitoring:
             print("🔍 Memory monitoring enabled for ROBOT operations")
         
-        # Process each non-base ontology
-        for filename in os.listdir(non_base_dir):
-            # Skip non-ontology files
-            if not filename.endswith(('.owl', '.ofn', '.obo')):
-                continue
-                
-            # Skip if already a base version
-            if '-base' in filename:
-                continue
-                
-            input_path = os.path.join(non_base_dir, filename)
+        # Read the PyOBO section once rather than per file
+        pyobo_filenames = load_pyobo_filenames(repo_path)
+        
+        # Scan both directories once instead of a stat per ontology
+        with os.scandir(owl_dir) as it:
+            existing_outputs = {entry.name for entry in it if entry.is_file()}
+        with os.scandir(non_base_dir) as it:
+            # Only ontology files that are not already a base version
+            candidates = sorted(
+                (entry for entry in it
+                 if entry.is_file()
+                 and entry.name.endswith(('.owl', '.ofn', '.obo'))
+                 and '-base' not in entry.name),
+                key=lambda entry: entry.name
+            )
+        
+        # Work out which ontologies need ROBOT before launching any JVMs
+        robot_jobs = []
+        for entry in candidates:
+            filename = entry.name
+            input_path = entry.path
             
             # Handle PyOBO ontologies
-            if is_pyobo_ontology(filename, repo_path):
+            if is_pyobo_ontology(filename, repo_path, pyobo_filenames):
                 print(f"Copying PyOBO ontology to main directory: {filename}")
-                output_path = os.path.join(owl_dir, filename)
-                if not os.path.exists(output_path):
-                    import shutil
-                    shutil.copy2(input_path, output_path)
+                if filename not in existing_outputs:
+                    shutil.copy2(input_path, os.path.join(owl_dir, filename))
                 continue
             
             # For non-PyOBO ontologies, create base version
@@ -90,64 +193,26 @@ def create_pseudo_base_ontologies(repo_path):
             output_path = os.path.join(owl_dir, base_filename)
             
             # Check if base version already exists
-            if os.path.exists(output_path):
+            if base_filename in existing_outputs:
                 print(f"Base version already exists for {filename}, skipping...")
                 continue
                 
             # Get base IRI from filename
             base_iri = extract_prefix_from_filename(filename)
             
+            print(f"Queued {filename} (base IRI: {base_iri})")
+            robot_jobs.append((filename, base_filename, build_robot_command(input_path, base_iri, output_path)))
+        
+        if robot_jobs:
+            print(f"Running {len(robot_jobs)} ROBOT job(s), {max_workers} at a time")
+        
+        def process(job):
+            filename, base_filename, robot_command = job
             print(f"Processing {filename}...")
-            print(f"Using base IRI: {base_iri}")
-            
-            # Build ROBOT command with improved parameters matching the Makefile approach
-            robot_command = [
-                'robot', 'remove',
-                '--input', input_path,
-                '--base-iri', base_iri,
-                '--axioms', 'external',
-                '--preserve-structure', 'false',
-                '--trim', 'false',
-                'remove', '--select', 'imports',
-                '--trim', 'false',
-                '--output', output_path
-            ]
-            
-            print(f"Executing command:\n{' '.join(robot_command)}")
-            
-            # Run ROBOT command with optional memory monitoring
-            try:
-                if enable_monitoring:
-                    # Use memory monitor for this individual ROBOT operation
-                    monitor_script = os.path.join(os.path.dirname(__file__), 'memory_monitor.py')
-                    monitor_command = [
-                        'python3', monitor_script,
-                        f'ROBOT_base_{filename}',
-                        ' '.join(robot_command),
-                        repo_path,
-                        str(os.getenv('MEMORY_MONITOR_INTERVAL', '15'))
-                    ]
-                    result = subprocess.run(monitor_command, check=True)
-                else:
-                    # Run ROBOT command normally
-                    result = subprocess.run(
-                        robot_command,
-                        check=True,
-                        capture_output=True,
-                        text=True
-                    )
-                    if result.stdout:
-                        print("STDOUT:", result.stdout)
-                
-                print(f"Created base version for {filename}: {base_filename}")
-            except subprocess.CalledProcessError as e:
-                print(f"Error processing {filename}:")
-                if hasattr(e, 'stderr') and e.stderr:
-                    print("STDERR:", e.stderr)
-                if hasattr(e, 'stdout') and e.stdout:
-                    print("STDOUT:", e.stdout)
-                print("\nFull command that failed:")
-                print(' '.join(robot_command) if not enable_monitoring else f"Memory-monitored command for {filename}")
+            return run_robot(filename, base_filename, robot_command, repo_path, enable_monitoring, log_dir, robot_env)
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(process, robot_jobs))
         
         print("\nProcessing complete!")
         return True
@@ -2,20 +2,91 @@
 Enhanced download functionality with version tracking and robust error handling.
 """
 
+import atexit
 import os
 import requests
 import gzip
-import shutil
+import hashlib
+import json
+import threading
 import time
+from functools import lru_cache
 from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+import urllib3
+from urllib3.util import Retry
+
+try:
+    import rapidgzip  # Parallel gzip decompression
+except ImportError:
+    rapidgzip = None
 from version_tracker import (
     should_download, get_file_checksum, backup_old_version,
     log_download_attempt, update_version_info, load_version_info
 )
 
+# Connection failures and transient 429/5xx answers are retried by urllib3
+# inside the pool, with exponential backoff and honouring Retry-After
+DOWNLOAD_RETRIES = Retry(
+    total=3,
+    backoff_factor=1,
+    status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=frozenset(['GET', 'HEAD']),
+    respect_retry_after_header=True,
+    raise_on_status=False,
+)
+
+# Errors from a body that breaks off mid-stream, which the adapter's Retry
+# cannot see because the response headers were already received
+STREAM_ERRORS = (
+    requests.exceptions.ChunkedEncodingError,
+    requests.exceptions.ConnectionError,
+    urllib3.exceptions.ProtocolError,
+    urllib3.exceptions.ReadTimeoutError,
+    EOFError,  # gzip stream cut short
+)
+
+# Shared session so concurrent downloads reuse pooled keep-alive connections.
+# The per-host pool is sized to the download workers (and at least the 16
+# HEAD-check threads) so no worker has to open a throwaway connection.
+SESSION = requests.Session()
+_pool_size = max(16, int(os.environ.get('PARALLEL_DOWNLOADS', '10')))
+_adapter = HTTPAdapter(pool_connections=16, pool_maxsize=_pool_size, max_retries=DOWNLOAD_RETRIES)
+SESSION.mount('http://', _adapter)
+SESSION.mount('https://', _adapter)
+
+# Streaming chunk size for downloads and decompression
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+
 
+def open_gzip(path):
+    """Open a .gz file for binary reading, in parallel when rapidgzip is installed."""
+    if rapidgzip is not None:
+        return rapidgzip.open(path, parallelization=os.cpu_count() or 1)
+    return gzip.open(path, 'rb')
+
+# Serializes read-modify-write of the version file and download log
+_version_lock = threading.Lock()
+
+# On-disk cache of HEAD results (url -> {"ok", "checked_at"}), so re-runs
+# skip the OBO Foundry availability round trips; a TTL of 0 disables it
+HEAD_CACHE_FILE = os.environ.get(
+    'OBO_HEAD_CACHE',
+    os.path.join(os.path.expanduser('~'), '.cache', 'kbase_cdm_ontologies', 'head_cache.json'))
+HEAD_CACHE_TTL = int(os.environ.get('OBO_HEAD_CACHE_TTL', '86400'))
+_head_cache = None
+_head_cache_dirty = False
+_head_cache_warned = False
+_head_cache_lock = threading.Lock()
+
+
+@lru_cache(maxsize=4)
 def get_output_directories(repo_path, test_mode=False):
-    """Get appropriate output directories based on test mode."""
+    """Get appropriate output directories based on test mode.
+    
+    Cached per (repo_path, test_mode): every download asks for the version
+    directory, and the directories only need creating once per run.
+    """
     if test_mode:
         ontology_data_path = os.path.join(repo_path, 'ontology_data_owl_test')
         non_base_dir = os.path.join(ontology_data_path, 'non-base-ontologies')
@@ -42,42 +113,107 @@ def is_test_mode():
     return 'test' in source_file.lower()
 
 
-def download_with_retry(url, max_retries=3, timeout=30):
-    """Download with exponential backoff retry logic."""
-    for attempt in range(max_retries):
+def _get_head_cache():
+    """Load the HEAD cache on first use; callers hold _head_cache_lock."""
+    global _head_cache
+    if _head_cache is None:
         try:
-            response = requests.get(url, timeout=timeout)
+            with open(HEAD_CACHE_FILE, 'r') as f:
+                _head_cache = json.load(f)
+        except (OSError, ValueError):
+            _head_cache = {}
+    return _head_cache
+
+
+def flush_head_cache():
+    """Write new HEAD results to disk atomically, if there are any.
+    
+    url_exists only updates the in-memory cache; this runs after each batch
+    of checks and at exit. A failed write is reported once per process.
+    """
+    global _head_cache_dirty, _head_cache_warned
+    with _head_cache_lock:
+        if not _head_cache_dirty:
+            return
+        try:
+            os.makedirs(os.path.dirname(HEAD_CACHE_FILE), exist_ok=True)
+            tmp_path = f"{HEAD_CACHE_FILE}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(_head_cache, f)
+            os.replace(tmp_path, HEAD_CACHE_FILE)
+            _head_cache_dirty = False
+        except OSError as e:
+            if not _head_cache_warned:
+                print(f"⚠️  Could not write HEAD cache {HEAD_CACHE_FILE}: {e}")
+                _head_cache_warned = True
+
+
+atexit.register(flush_head_cache)
+
+
+def url_exists(url, timeout=5):
+    """Return whether a HEAD request for url (following redirects) gives 200.
+    
+    Answers are cached on disk (see flush_head_cache) for HEAD_CACHE_TTL
+    seconds. Network errors count as "missing" but are not cached.
+    """
+    global _head_cache_dirty
+    now = time.time()
+    if HEAD_CACHE_TTL > 0:
+        with _head_cache_lock:
+            entry = _get_head_cache().get(url)
+        if entry and now - entry['checked_at'] < HEAD_CACHE_TTL:
+            return entry['ok']
+    
+    try:
+        ok = SESSION.head(url, allow_redirects=True, timeout=timeout).status_code == 200
+    except requests.RequestException:
+        return False
+    
+    if HEAD_CACHE_TTL > 0:
+        with _head_cache_lock:
+            _get_head_cache()[url] = {'ok': ok, 'checked_at': now}
+            _head_cache_dirty = True
+    return ok
+
+
+def _write_body(response, dest_path, decompress):
+    """Write a streamed response body to dest_path and return its SHA256."""
+    sha256_hash = hashlib.sha256()
+    if decompress:
+        response.raw.decode_content = True
+        gz = gzip.GzipFile(fileobj=response.raw)
+        chunks = iter(lambda: gz.read(DOWNLOAD_CHUNK_SIZE), b'')
+    else:
+        chunks = response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE)
+    with open(dest_path, 'wb') as f:
+        for chunk in chunks:
+            f.write(chunk)
+            sha256_hash.update(chunk)
+    return sha256_hash.hexdigest()
+
+
+def download_with_retry(url, dest_path, max_retries=3, timeout=30, decompress=False):
+    """Stream a URL to dest_path with exponential backoff retry logic.
+    
+    Connection errors and 429/5xx answers are retried by SESSION's adapter;
+    a body that breaks off mid-stream is retried here, restarting dest_path
+    (and the gzip decoder) from scratch. The body is written in chunks and
+    hashed on the fly, so memory use does not depend on the file size. With
+    decompress=True a gzipped body is decompressed on the way, so the file
+    never touches disk compressed. Returns the SHA256 of the bytes written.
+    """
+    for attempt in range(max_retries):
+        with SESSION.get(url, stream=True, timeout=timeout) as response:
             response.raise_for_status()
-            return response
-        except requests.exceptions.RequestException as e:
-            if attempt < max_retries - 1:
+            try:
+                return _write_body(response, dest_path, decompress)
+            except STREAM_ERRORS as e:
+                if attempt == max_retries - 1:
+                    raise
                 wait_time = 2 ** attempt  # Exponential backoff
                 print(f"⚠️  Attempt {attempt + 1} failed for {url}, retrying in {wait_time}s: {str(e)}")
-                time.sleep(wait_time)
-            else:
-                raise e
-
-
-def handle_compressed_file(response, output_path, url):
-    """Handle compressed (.gz) file downloads."""
-    if url.endswith('.gz'):
-        # Save compressed file temporarily
-        gz_path = output_path + '.gz'
-        with open(gz_path, 'wb') as f:
-            f.write(response.content)
-        
-        # Decompress
-        with gzip.open(gz_path, 'rb') as f_in:
-            with open(output_path, 'wb') as f_out:
-                shutil.copyfileobj(f_in, f_out)
-        
-        # Remove compressed file
-        os.remove(gz_path)
-        print(f"✅ Downloaded and decompressed: {os.path.basename(output_path)}")
-    else:
-        with open(output_path, 'wb') as f:
-            f.write(response.content)
-        print(f"✅ Downloaded: {os.path.basename(output_path)}")
+        time.sleep(wait_time)
 
 
 def download_ontology_with_versioning(url, output_path, repo_path, force_download=False):
@@ -104,7 +240,8 @@ def download_ontology_with_versioning(url, output_path, repo_path, force_downloa
         if not force_download:
             needs_download, reason = should_download(output_path, url, version_file)
             if not needs_download:
-                log_download_attempt(version_dir, filename, "skipped", None, url)
+                with _version_lock:
+                    log_download_attempt(version_dir, filename, "skipped", None, url)
                 return True, "skipped", f"File up to date: {filename}"
         
         # Get current checksum if file exists
@@ -113,49 +250,48 @@ def download_ontology_with_versioning(url, output_path, repo_path, force_downloa
             old_checksum = get_file_checksum(output_path)
             backup_old_version(output_path, old_checksum, version_dir)
         
-        # Download with retry logic
-        print(f"📥 Downloading {filename}...")
-        response = download_with_retry(url)
-        
-        # Calculate new checksum
-        new_checksum = get_file_checksum(response.content)
-        
-        # Check if content actually changed
-        if old_checksum == new_checksum and not force_download:
-            log_download_attempt(version_dir, filename, "no_change", old_checksum, url)
-            return True, "no_change", f"No changes detected: {filename}"
-        
         # Ensure output directory exists
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         
-        # Handle compressed files
-        if isinstance(response.content, bytes):
-            # Create a mock response object for handle_compressed_file
-            class MockResponse:
-                def __init__(self, content):
-                    self.content = content
+        # Download with retry logic into a partial file next to the target;
+        # .gz files are decompressed while streaming, so the checksum is of
+        # the same bytes should_download() hashes on the next run
+        print(f"📥 Downloading {filename}...")
+        compressed = url.endswith('.gz')
+        download_path = output_path + '.part'
+        try:
+            new_checksum = download_with_retry(url, download_path, decompress=compressed)
             
-            handle_compressed_file(MockResponse(response.content), output_path, url)
-        else:
-            handle_compressed_file(response, output_path, url)
-        
-        # Update version tracking
-        update_version_info(version_file, filename, url, old_checksum, new_checksum)
+            # Check if content actually changed
+            if old_checksum == new_checksum and not force_download:
+                with _version_lock:
+                    log_download_attempt(version_dir, filename, "no_change", old_checksum, url)
+                return True, "no_change", f"No changes detected: {filename}"
+            
+            os.replace(download_path, output_path)
+            print(f"✅ Downloaded{' and decompressed' if compressed else ''}: {filename}")
+        finally:
+            if os.path.exists(download_path):
+                os.remove(download_path)
         
-        # Log successful download
+        # Update version tracking and log successful download
         status = "updated" if old_checksum else "new"
-        log_download_attempt(version_dir, filename, status, new_checksum, url)
+        with _version_lock:
+            update_version_info(version_file, filename, url, old_checksum, new_checksum)
+            log_download_attempt(version_dir, filename, status, new_checksum, url)
         
         return True, status, f"Successfully downloaded: {filename}"
         
     except requests.exceptions.RequestException as e:
         error_msg = f"Network error downloading {filename}: {str(e)}"
-        log_download_attempt(version_dir, filename, "error", None, url, str(e))
+        with _version_lock:
+            log_download_attempt(version_dir, filename, "error", None, url, str(e))
         return False, "error", error_msg
         
     except Exception as e:
         error_msg = f"Unexpected error downloading {filename}: {str(e)}"
-        log_download_attempt(version_dir, filename, "error", None, url, str(e))
+        with _version_lock:
+            log_download_attempt(version_dir, filename, "error", None, url, str(e))
         return False, "error", error_msg
 
 
@@ -185,21 +321,3 @@ def download_ontology_safe(url, output_path, repo_path, force_download=False):
         print(f"❌ {message}")
     
     return success
-
-
-def get_file_checksum(content_or_path):
-    """Calculate checksum from file content or file path."""
-    import hashlib
-    
-    sha256_hash = hashlib.sha256()
-    
-    if isinstance(content_or_path, (bytes, bytearray)):
-        # Content bytes
-        sha256_hash.update(content_or_path)
-    else:
-        # File path
-        with open(content_or_path, "rb") as f:
-            for byte_block in iter(lambda: f.read(4096), b""):
-                sha256_hash.update(byte_block)
-    
-    return sha256_hash.hexdigest()
\ No newline at end of file
@@ -1,10 +1,168 @@
 # merge_ontologies.py
 import os
+import sys
+import hashlib
+import shutil
 import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import chain
 from typing import Optional, List
 from pathlib import Path
 from enhanced_download import get_output_directories, is_test_mode
 
+@lru_cache(maxsize=None)
+def find_robot() -> Optional[str]:
+    """Locate the ROBOT executable on PATH once per process."""
+    return shutil.which('robot')
+
+# Heap settings used when ROBOT_JAVA_ARGS is not set. The JVM caps the heap
+# at 75% of the memory it can see (container limits included) and only
+# commits it as the merge grows; G1 keeps pauses short on large heaps.
+DEFAULT_MERGE_JAVA_ARGS = '-XX:MaxRAMPercentage=75 -XX:+UseG1GC -XX:MaxGCPauseMillis=200'
+
+def drop_duplicate_inputs(entries: List[os.DirEntry]) -> List[os.DirEntry]:
+    """
+    Drop entries that are the same file as an earlier one (symlinks or hard
+    links), so ROBOT does not parse and merge one ontology twice.
+    """
+    seen = {}
+    unique = []
+    for entry in entries:
+        stat = entry.stat()
+        key = (stat.st_dev, stat.st_ino)
+        if key in seen:
+            print(f"⚠️  Skipping {entry.name}: same file as {seen[key]}")
+            continue
+        seen[key] = entry.name
+        unique.append(entry)
+    return unique
+
+def find_unreadable(ontology_files: List[str]) -> List[str]:
+    """
+    Return the inputs the current user cannot read.
+    
+    The checks run concurrently because on network storage each one is a
+    round trip rather than real work.
+    """
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        readable = list(executor.map(lambda f: os.access(f, os.R_OK), ontology_files))
+    return [f for f, ok in zip(ontology_files, readable) if not ok]
+
+def prefetch_inputs(ontology_files: List[str]) -> None:
+    """
+    Ask the kernel to start reading the inputs into the page cache.
+    
+    Run in a background thread so the readahead overlaps with JVM startup.
+    A no-op where posix_fadvise is unavailable.
+    """
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    for ontology_file in ontology_files:
+        try:
+            fd = os.open(ontology_file, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        finally:
+            os.close(fd)
+
+def write_atomic(path: str, text: str) -> None:
+    """Write text in one call to a temporary file, then rename it over path."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+def merge_manifest(entries: List[os.DirEntry], robot_command: List[str]) -> str:
+    """
+    Digest of the merge inputs and command, stored next to the output.
+    
+    Inputs are identified by name, size and mtime, so the output is only
+    reused when neither the ontology set nor the ROBOT pipeline changed.
+    """
+    digest = hashlib.sha256(' '.join(robot_command).encode())
+    for entry in entries:
+        stat = entry.stat()
+        digest.update(f"\n{entry.name}\t{stat.st_size}\t{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()
+
+def is_merge_up_to_date(output_file: str, manifest_path: str, manifest: str,
+                        entries: List[os.DirEntry]) -> bool:
+    """True if output_file is newer than every input and its manifest matches."""
+    try:
+        output_mtime = os.stat(output_file).st_mtime_ns
+        with open(manifest_path) as f:
+            stored = f.read().strip()
+    except OSError:
+        return False
+    newest_input = max(entry.stat().st_mtime_ns for entry in entries)
+    return output_mtime > newest_input and stored == manifest
+
+def build_merge_command(ontology_files: List[str], output_file: str) -> List[str]:
+    """
+    Build the ROBOT command that merges the inputs, strips problem axioms and
+    writes the result, chained so the merged ontology is loaded once in a
+    single JVM and never written to disk in between.
+    
+    ROBOT picks the output format from the extension of output_file.
+    """
+    return list(chain(
+        # Merge with annotate-defined-by
+        ['robot', 'merge', '--annotate-defined-by', 'true'],
+        
+        # Input files
+        chain.from_iterable(('--input', ontology_file) for ontology_file in ontology_files),
+        
+        # Remove disjoint axioms. This stays a separate step from the
+        # owl:Nothing removal: in one remove, --term seeds the selection and
+        # --axioms only filters it, so only disjoint axioms about owl:Nothing
+        # would go.
+        ['remove', '--axioms', 'disjoint', '--trim', 'true', '--preserve-structure', 'false'],
+        
+        # Remove 'owl:Nothing' term
+        ['remove', '--term', 'owl:Nothing', '--trim', 'true', '--preserve-structure', 'false'],
+        
+        # Output file
+        ['--output', output_file],
+    ))
+
+def run_streaming(command: List[str], env: Optional[dict] = None) -> int:
+    """
+    Run command, forwarding its combined stdout/stderr line by line as it
+    is produced rather than buffering the whole log until exit.
+    
+    Output is passed through as raw bytes when stdout has a binary buffer,
+    skipping a decode and re-encode; a replaced stdout (log tee, pytest
+    capture, StringIO) gets decoded text instead. stdin is closed so the
+    tool never waits on a terminal.
+    
+    Raises:
+        subprocess.CalledProcessError: If the command exits non-zero
+    """
+    sys.stdout.flush()
+    buffer = getattr(sys.stdout, 'buffer', None)
+    with subprocess.Popen(
+        command,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        env=env
+    ) as proc:
+        for line in proc.stdout:
+            if buffer is not None:
+                buffer.write(line)
+                buffer.flush()
+            else:
+                sys.stdout.write(line.decode(errors='replace'))
+                sys.stdout.flush()
+        return_code = proc.wait()
+    if return_code:
+        raise subprocess.CalledProcessError(return_code, command)
+    return return_code
+
 def merge_ontologies(
     repo_path: str,
     input_dir_name: str = 'ontology_data_owl',
@@ -38,8 +196,7 @@ def merge_ontologies(
         print(f"📁 Output directory: {output_dir}")
         
         # Find ROBOT executable in PATH
-        import shutil
-        robot_path = shutil.which('robot')
+        robot_path = find_robot()
         if not robot_path:
             raise FileNotFoundError("ROBOT executable not found. Please ensure ROBOT is installed and in your PATH.")
         
@@ -56,66 +213,67 @@ def merge_ontologies(
         # Create full output path
         output_file = os.path.join(output_dir, output_filename)
         
-        # Set Java memory arguments for ROBOT
-        os.environ['ROBOT_JAVA_ARGS'] = '-Xmx4000G -XX:+UseParallelGC'
+        # Get ontology files in one directory scan; the entries already
+        # confirm each file exists and carry its size for the heap estimate
+        # (sorted, so the command and its manifest are stable between runs)
+        with os.scandir(input_dir) as it:
+            entries = sorted(
+                (entry for entry in it
+                 if entry.is_file() and entry.name.endswith(('.owl', '.ofn', '.obo'))),
+                key=lambda entry: entry.name
+            )
+        entries = drop_duplicate_inputs(entries)
+        ontology_filenames = [entry.name for entry in entries]
         
-        # Get list of ontology files with full paths
-        ontology_files = [
-            os.path.join(input_dir, f) 
-            for f in os.listdir(input_dir) 
-            if f.endswith(('.owl', '.ofn', '.obo'))
-        ]
+        # Merge the largest ontologies first so OWLAPI's axiom sets are sized
+        # up front instead of rehashing when a big input arrives late
+        if os.getenv('MERGE_LARGEST_FIRST', 'true').lower() == 'true':
+            entries.sort(key=lambda entry: entry.stat().st_size, reverse=True)
+        ontology_files = [entry.path for entry in entries]
         
         print(f"Found {len(ontology_files)} ontology files:")
         for f in ontology_files:
             print(f"  - {f}")
-            # Verify each file exists and is readable
-            if not os.path.exists(f):
-                raise FileNotFoundError(f"Ontology file not found: {f}")
-            if not os.access(f, os.R_OK):
-                raise PermissionError(f"Cannot read ontology file: {f}")
+        
+        # Verify each file is readable
+        unreadable = find_unreadable(ontology_files)
+        if unreadable:
+            raise PermissionError(f"Cannot read ontology files: {', '.join(unreadable)}")
             
         if not ontology_files:
             raise FileNotFoundError(f"No ontology files found in '{input_dir}'")
             
-        # Get just the filenames and create merged list
-        ontology_filenames = [os.path.basename(f) for f in ontology_files]
+        # Use ROBOT_JAVA_ARGS from the environment (.env, Docker, k8s) or the
+        # default heap settings, in the child's environment only
+        robot_env = {
+            **os.environ,
+            'ROBOT_JAVA_ARGS': os.environ.get('ROBOT_JAVA_ARGS', DEFAULT_MERGE_JAVA_ARGS)
+        }
+        print(f"ROBOT memory settings: {robot_env['ROBOT_JAVA_ARGS']}")
+        
+        # Create merged list from the filenames
         # Use test-specific filename in test mode
         merged_filename = 'ontologies_merged_test.txt' if test_mode else 'ontologies_merged.txt'
         merged_list_path = os.path.join(repo_path, 'config', merged_filename)
-        with open(merged_list_path, 'w') as f:
-            for filename in sorted(ontology_filenames):
-                f.write(f"{filename}\n")
+        write_atomic(merged_list_path, ''.join(f"{filename}\n" for filename in ontology_filenames))
         print(f"Created list of merged ontologies at: {merged_list_path}")
         
         # Build ROBOT command
-        robot_command = ['robot', 'merge']
-        
-        # Add annotate-defined-by parameter
-        robot_command.extend(['--annotate-defined-by', 'true'])
-        
-        # Add input files
-        for ontology_file in ontology_files:
-            robot_command.extend(['--input', ontology_file])
-        
-        # Remove disjoint axioms
-        robot_command.extend([
-            'remove', '--axioms', 'disjoint',
-            '--trim', 'true', '--preserve-structure', 'false'
-        ])
+        robot_command = build_merge_command(ontology_files, output_file)
         
-        # Remove 'owl:Nothing' term
-        robot_command.extend([
-            'remove', '--term', 'owl:Nothing',
-            '--trim', 'true', '--preserve-structure', 'false'
-        ])
-        
-        # Add output file
-        robot_command.extend(['--output', output_file])
+        # Skip ROBOT entirely when the same inputs were already merged
+        manifest_path = f"{output_file}.manifest.sha256"
+        manifest = merge_manifest(entries, robot_command)
+        if is_merge_up_to_date(output_file, manifest_path, manifest, entries):
+            print(f"♻️  {output_file} is up to date with its inputs; skipping merge")
+            return True
         
         print(f"Saving output to: {output_file}")
         print(f"\nExecuting command:\n{' '.join(robot_command)}")
         
+        # Warm the page cache while the JVM boots
+        threading.Thread(target=prefetch_inputs, args=(ontology_files,), daemon=True).start()
+        
         # Check if memory monitoring is enabled
         enable_monitoring = os.getenv('ENABLE_MEMORY_MONITORING', 'false').lower() == 'true'
         
@@ -131,21 +289,16 @@ def merge_ontologies(
                     repo_path,
                     str(os.getenv('MEMORY_MONITOR_INTERVAL', '15'))
                 ]
-                result = subprocess.run(monitor_command, check=True)
-                return_code = result.returncode
-            else:
-                # Run ROBOT command normally with more detailed output
                 result = subprocess.run(
-                    robot_command,
-                    check=True,
-                    capture_output=True,
-                    text=True
+                    monitor_command, check=True, stdin=subprocess.DEVNULL, env=robot_env
                 )
-                print("\nROBOT Output:")
-                if result.stdout:
-                    print(result.stdout)
                 return_code = result.returncode
+            else:
+                # Run ROBOT command normally, streaming its output
+                print("\nROBOT Output:")
+                return_code = run_streaming(robot_command, env=robot_env)
             
+            write_atomic(manifest_path, f"{manifest}\n")
             print(f"Successfully merged ontologies into {output_file}")
             return True
             
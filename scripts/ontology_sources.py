@@ -0,0 +1,46 @@
+"""
+Reading of the ontology source list (ontologies_source.txt).
+
+The source list groups ontology URLs under '#' section headers, e.g.
+
+    #Core Ontologies from OBO Foundry
+    http://purl.obolibrary.org/obo/envo.owl
+"""
+
+import os
+
+CORE_SECTION = "Core Ontologies from OBO Foundry"
+CLOSURE_NON_BASE_SECTION = "Core closure ontologies non base version"
+CLOSURE_BASE_SECTION = "Core closure ontologies -base version"
+ADDITIONAL_SECTION = "Additional OBO Foundry ontologies"
+PYOBO_SECTION = "PyOBO Controlled Vocabularies and Ontologies"
+IN_HOUSE_SECTION = "In-house Ontologies"
+
+
+def get_source_file(repo_path):
+    """Path of the ontology source list, honouring ONTOLOGIES_SOURCE_FILE."""
+    source_file = os.environ.get('ONTOLOGIES_SOURCE_FILE', 'ontologies_source.txt')
+    return os.path.join(repo_path, source_file)
+
+
+def ontology_name(url):
+    """Ontology name from a URL or file name: the last path segment up to its first '.'."""
+    return url.rpartition('/')[2].partition('.')[0]
+
+
+def parse_sections(path):
+    """Parse a source list into {section header: [entries]} in file order.
+
+    Headers are stored without the leading '#'. Entries that appear before
+    the first header are stored under None.
+    """
+    sections = {None: []}
+    entries = sections[None]
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith('#'):
+                entries = sections.setdefault(line[1:].strip(), [])
+            elif line:
+                entries.append(line)
+    return sections
@@ -6,6 +6,7 @@ Tracks downloads, checksums, and changes for ontology files.
 import os
 import json
 import hashlib
+import mmap
 import shutil
 from datetime import datetime
 from pathlib import Path
@@ -13,9 +14,16 @@ from pathlib import Path
 
 def get_file_checksum(filepath):
     """Calculate SHA256 checksum of a file."""
-    sha256_hash = hashlib.sha256()
     with open(filepath, "rb") as f:
-        for byte_block in iter(lambda: f.read(4096), b""):
+        # Hash the whole file from a read-only mapping in one call (OpenSSL,
+        # GIL released); empty or unmappable files use chunked reads
+        try:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return hashlib.sha256(mm).hexdigest()
+        except (ValueError, OSError, OverflowError):
+            pass
+        sha256_hash = hashlib.sha256()
+        for byte_block in iter(lambda: f.read(1 << 20), b""):
             sha256_hash.update(byte_block)
     return sha256_hash.hexdigest()
 
@@ -0,0 +1,72 @@
+"""Tests for the streaming download retry in scripts/enhanced_download.py."""
+
+import gzip
+import hashlib
+import http.server
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+import enhanced_download  # noqa: E402
+
+ONTOLOGY = b'<rdf:RDF>' + b'<owl:Class/>' * 50000 + b'</rdf:RDF>'
+
+
+@pytest.fixture
+def truncating_server():
+    """Serve ONTOLOGY (gzipped for *.gz paths), cutting the first response short."""
+    requests_seen = []
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            requests_seen.append(self.path)
+            body = gzip.compress(ONTOLOGY) if self.path.endswith('.gz') else ONTOLOGY
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if len(requests_seen) == 1:
+                # Promise the full length, send half, then drop the connection
+                self.wfile.write(body[:len(body) // 2])
+                self.wfile.flush()
+                self.close_connection = True
+                return
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_port}', requests_seen
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize('filename, decompress', [('x.owl', False), ('x.owl.gz', True)])
+def test_truncated_body_is_retried(truncating_server, monkeypatch, tmp_path, filename, decompress):
+    base_url, requests_seen = truncating_server
+    monkeypatch.setattr(enhanced_download.time, 'sleep', lambda seconds: None)
+    dest_path = tmp_path / 'x.owl.part'
+
+    checksum = enhanced_download.download_with_retry(
+        f'{base_url}/{filename}', str(dest_path), decompress=decompress)
+
+    assert len(requests_seen) == 2
+    assert dest_path.read_bytes() == ONTOLOGY
+    assert checksum == hashlib.sha256(ONTOLOGY).hexdigest()
+
+
+def test_truncated_body_fails_after_max_retries(truncating_server, monkeypatch, tmp_path):
+    base_url, requests_seen = truncating_server
+    monkeypatch.setattr(enhanced_download.time, 'sleep', lambda seconds: None)
+
+    with pytest.raises(enhanced_download.STREAM_ERRORS):
+        enhanced_download.download_with_retry(
+            f'{base_url}/x.owl', str(tmp_path / 'x.owl.part'), max_retries=1)
+    assert len(requests_seen) == 1